@@ -1,25 +1,78 @@
 import os
 import sys
 
+import pandas as pd
+
 # Absolute path to the folder containing the module
 sys.path.append(os.path.abspath('./state_of_art_repos'))
 
-from DIAMOnD.DIAMOnD import run_diamond_from_args
+from DIAMOnD.DIAMOnD import read_input, run_diamond
+from DIAMOnD.diamond_permutation import diamond_permutation_test
+from DIAMOnD.hypergeom_store import HypergeomLookupStore
 
 
 class DIAMOND:
-    def __init__(self, alpha=1):
+    def __init__(self, alpha=1, kernel='auto', lookup_store_dir=None):
+        # lookup_store_dir keeps the log-gammas of all kernels across runs; the
+        # cached p-values are only used by kernel='python'
         self.alpha = alpha
+        self.kernel = kernel
+        self.lookup_store = None
+        if lookup_store_dir is not None:
+            self.lookup_store = HypergeomLookupStore(lookup_store_dir)
+
+    def run_diamond(self, ppi, seed_nodes, n, outfile=None):
+        """
+        Run the DIAMOnD method
+
+        Args:
+            ppi: path to the PPI edgelist
+            seed_nodes: path to the file with the seed nodes
+            n: number of nodes to be added to the module
+            outfile: optional path or writer where the ranked nodes are saved
 
-    def run_diamond(self, ppi, seed_nodes, n):
-        seed_genes, added_nodes = run_diamond_from_args([
-            ppi,
-            seed_nodes,
-            str(n)
-        ])
-        added_genes = set([gene[0] for gene in added_nodes])
+        Returns:
+            dict: seed nodes and the DIAMOnD nodes in the order they were added
+        """
+        G, seed_genes = read_input(ppi, seed_nodes)
+        diamond_result = run_diamond(G, seed_genes, n, self.alpha, outfile=outfile,
+                                     kernel=self.kernel, lookup_store=self.lookup_store)
+        if self.lookup_store is not None and self.lookup_store.dirty:
+            self.lookup_store.save()
         result = {
             'seed_nodes': list(seed_genes)
         }
-        result['seed_nodes_module_1'] = list(added_genes)
+        result['seed_nodes_module_1'] = list(diamond_result.nodes)
         return result
+
+    def run_diamond_significance(self, ppi, seed_nodes, n, n_permutations=1000,
+                                 processes=None, random_state=None):
+        """
+        Run DIAMOnD and assess every added node against degree-preserving
+        random seed sets
+
+        Args:
+            ppi: path to the PPI edgelist
+            seed_nodes: path to the file with the seed nodes
+            n: number of nodes to be added to the module
+            n_permutations: number of random seed sets
+            processes: number of worker processes (default: all cores)
+            random_state: seed for reproducible random seed sets
+
+        Returns:
+            pd.DataFrame: one row per added node (in order) with its
+            connectivity p-value and its empirical p-value
+        """
+        G, seed_genes = read_input(ppi, seed_nodes)
+        permutation_result = diamond_permutation_test(
+            G, seed_genes, n, self.alpha,
+            n_permutations=n_permutations,
+            processes=processes,
+            random_state=random_state,
+            kernel=self.kernel
+        )
+        return pd.DataFrame({
+            'node': permutation_result.nodes,
+            'p': permutation_result.p,
+            'empirical_p': permutation_result.empirical_p
+        })
@@ -1,6 +1,5 @@
 import os
 import sys
-import tempfile
 from pathlib import Path
 
 import networkx as nx
@@ -8,63 +7,59 @@ import pandas as pd
 
 # Absolute path to the folder containing the module
 sys.path.append(os.path.abspath('./state_of_art_repos/DOMINO'))
-from src.runner import main_domino, main_slicer
-
-# from src.core.domino import main as main_domino
-# from src.core.preprocess_slices import main as main_slicer
+from src.core.domino import DominoPool, domino_network, run_domino
 
 
 class DOMINO:
-    def __init__(self):
-        pass
-
-    def _run_domino_pipeline(self, G, seed_nodes):
-        # Save PPI to temp file
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as ppi_file:
-            for u, v in G.edges():
-                ppi_file.write(f"{u}\t{v}\n")
-            ppi_path = ppi_file.name
-
-        # Save seeds to temp file
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as seeds_file:
-            for node in seed_nodes:
-                seeds_file.write(f"{node}\n")
-            seeds_path = seeds_file.name
-
-        # Create slices file
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as slices_file:
-            slices_path = slices_file.name
-
-        # Create output folder
-        output_folder = tempfile.mkdtemp()
-
-        # Step 1: run slicer
-        sys.argv = [
-            "preprocess_slices.py",
-            "-n", ppi_path,
-            "-o", slices_path
-        ]
-        main_slicer()
-
-        # Step 2: run DOMINO with full args
-        sys.argv = [
-            "runner.py",
-            "-a", seeds_path,
-            "-n", ppi_path,
-            "-s", slices_path,
-            "-o", output_folder,
-            "-c", "false",              # avoid pickle cache
-            "-p", "1",                  # single-thread
-            "-v", "false",              # skip visualization
-            "-sth", "0.3",              # slice threshold
-            "-mth", "0.05"              # module threshold
-        ]
-        G_final_modules = main_domino()
-
-        # Clean up if needed:
-        os.remove(ppi_path)
-        os.remove(seeds_path)
-        os.remove(slices_path)
+    def __init__(self, slice_threshold=0.3, module_threshold=0.05, processes=None, cache_dir=None,
+                 slicing_backend='python-louvain'):
+        self.slice_threshold = slice_threshold
+        self.module_threshold = module_threshold
+        # None: DOMINO's constants.N_OF_THREADS
+        self.processes = processes
+        # slices only depend on the network, cache them across diseases
+        self.cache_dir = cache_dir
+        # 'csr' is a compiled Louvain, much faster on large networks
+        self.slicing_backend = slicing_backend
+        # worker pool holding the network, reused by every disease on the same PPI file
+        self._pool = None
+        self._pool_key = None
+
+    def _get_pool(self, ppi_path):
+        key = (os.path.abspath(ppi_path), os.path.getmtime(ppi_path))
+        if self._pool_key != key:
+            self.close()
+            # Load PPI as dataframe
+            ppi_df = pd.read_csv(ppi_path, sep="\t", header=None, dtype=str)
+            ppi_df.columns = ["protein1", "protein2"]
+            G = nx.from_pandas_edgelist(ppi_df, source="protein1", target="protein2")
+            self._pool = DominoPool(domino_network(G), self.processes)
+            self._pool_key = key
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+            self._pool_key = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run_domino_pipeline(self, pool, seed_nodes):
+        # DOMINO slices the network itself and keeps everything in memory
+        G_final_modules = run_domino(
+            pool.network,
+            seed_nodes,
+            slice_threshold=self.slice_threshold,
+            module_threshold=self.module_threshold,
+            slices_cache_dir=self.cache_dir,
+            slicing_backend=self.slicing_backend,
+            pool=pool
+        )
         return G_final_modules
 
     def run_domino(self, ppi_path: str, seed_nodes_path: str):
@@ -74,19 +69,12 @@ class DOMINO:
         if not Path(seed_nodes_path).is_file():
             raise FileNotFoundError(f"Seed node file not found: {seed_nodes_path}")
 
-        # Load PPI as dataframe
-        ppi_df = pd.read_csv(ppi_path, sep="\t", header=None)
-        ppi_df.columns = ["protein1", "protein2"]
-
         # Load seed nodes
         with open(seed_nodes_path, "r") as f:
             seed_nodes = [line.strip() for line in f if line.strip()]
 
-        # Build graph
-        G = nx.from_pandas_edgelist(ppi_df, source="protein1", target="protein2")
-
-        # Run the DOMINO pipeline
-        G_final_modules = self._run_domino_pipeline(G, seed_nodes)
+        # Build graph (once per PPI file) and run the DOMINO pipeline
+        G_final_modules = self._run_domino_pipeline(self._get_pool(ppi_path), seed_nodes)
         result = {
             'seed_nodes': list(seed_nodes)
         }
@@ -1,15 +1,18 @@
 import os
-import subprocess
 import sys
-import tempfile
+
+import networkx as nx
+
+# Absolute path to the folder containing the module
+sys.path.append(os.path.abspath('./state_of_art_repos/robust_bias_aware'))
+from robust import Robust
 
 
 class ROBUST:
     def __init__(self,
                  alpha=0.25, beta=0.5, n=50, tau=0.5,
                  study_bias_scores='BAIT_USAGE', gamma=1.0,
-                 namespace='ENTREZ',
-                 robust_script_path='./state_of_art_repos/robust_bias_aware/robust.py'):
+                 namespace='ENTREZ'):
         self.alpha = alpha
         self.beta = beta
         self.n = n
@@ -17,7 +20,19 @@ class ROBUST:
         self.study_bias_scores = study_bias_scores
         self.gamma = gamma
         self.namespace = namespace
-        self.robust_script = os.path.abspath(robust_script_path)
+        # ROBUST keeps the parsed network, its edge weights and the PCST
+        # instance across diseases as long as df_gen_gen does not change
+        self._robust = None
+        self._network_df = None
+
+    def _get_robust(self, df_gen_gen):
+        if self._robust is None or self._network_df is not df_gen_gen:
+            edges = df_gen_gen.iloc[:, :2].astype(str)
+            network = nx.from_pandas_edgelist(edges, source=edges.columns[0], target=edges.columns[1])
+            study_bias_scores = None if self.study_bias_scores == 'NONE' else self.study_bias_scores
+            self._robust = Robust(network, self.namespace, study_bias_scores, self.gamma)
+            self._network_df = df_gen_gen
+        return self._robust
 
     def run_robust(self, df_gen_gen, seed_nodes, out_csv):
         """
@@ -25,33 +40,15 @@ class ROBUST:
         seed_nodes : list de ENTREZ IDs (strings)
         out_csv    : path to save the .csv output
         """
-
-        # Creation of temporary files for df_gen_gen and the seed genes
-        with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False) as tmp_ppi:
-            df_gen_gen.to_csv(tmp_ppi.name, sep='\t', index=False, header=False)
-            ppi_path = tmp_ppi.name
-
-        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as tmp_seeds:
-            for s in seed_nodes:
-                tmp_seeds.write(f"{s}\n")
-            seeds_path = tmp_seeds.name
-
-        # Creation of the ROBUST command
-        cmd = [
-            sys.executable, os.path.abspath(self.robust_script),
-            seeds_path, out_csv,  # los dos argumentos posicionales requeridos
-            '--network',    ppi_path,
-            '--namespace',  self.namespace,
-            '--alpha',      str(self.alpha),
-            '--beta',       str(self.beta),
-            '--n',          str(self.n),
-            '--tau',        str(self.tau),
-            '--study-bias-scores', self.study_bias_scores,
-            '--gamma',      str(self.gamma)
-        ]
-        subprocess.run(cmd, check=True)
-
-        # Removal of temporary files
-        os.remove(ppi_path)
-        os.remove(seeds_path)
+        robust = self._get_robust(df_gen_gen)
+        robust.run([str(s) for s in seed_nodes], self.alpha, self.beta, self.n, self.tau, out_csv)
         return out_csv
+
+    def sweep_robust(self, df_gen_gen, seed_nodes, alphas, betas, ns, taus, processes=1):
+        """
+        Runs ROBUST for all combinations of the parameters (see Robust.sweep).
+        Returns a dict (alpha, beta, n, tau) -> pd.DataFrame with the module
+        """
+        robust = self._get_robust(df_gen_gen)
+        modules = robust.sweep([str(s) for s in seed_nodes], alphas, betas, ns, taus, processes)
+        return {params: module_as_df for params, (module_as_df, _) in modules.items()}
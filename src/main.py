@@ -20,7 +20,7 @@ class Main():
         self.V = VisualizationModule()
         self.LCC = LCC()
         self.DIAMOND = DIAMOND()
-        self.DOMINO = DOMINO()
+        self.DOMINO = DOMINO(cache_dir="./src/outputs/domino_cache")
         self.ROBUST = ROBUST()
         self.TOPAS = TOPAS(expansion_steps=2, cores=4)
 
@@ -131,7 +131,11 @@ class Main():
         self.df_gen_gen = df_gen_gen
         df_pro_pro.to_csv("./src/inputs/PPI.txt", sep="\t", index=False)
         G_ppi, disease_pro_mapping = self.GPPI.main(df_pro_pro, df_dis_pro)
-        results_classical_methods = self.run_classical_methods(G_ppi, disease_pro_mapping)
+        try:
+            results_classical_methods = self.run_classical_methods(G_ppi, disease_pro_mapping)
+        finally:
+            # stop the DOMINO workers even if a method failed
+            self.DOMINO.close()
         self.save_classical_methods_results(results_classical_methods)
         for disease in self.selected_diseases:
             self.visualize_disease_results(
@@ -23,15 +23,21 @@
 
 import copy
 import csv
+import math
 import pickle
 import sys
 import time
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 
 import networkx as nx
 import numpy as np
 import scipy.stats
 
+try:
+    import numba
+except ImportError:  # optional, the numpy kernel is used instead
+    numba = None
+
 
 # =============================================================================
 def print_usage():
@@ -242,10 +248,389 @@ def reduce_not_in_cluster_nodes(all_degrees,neighbors,G,not_in_cluster,cluster_n
                                                                                        
     return reduced_not_in_cluster                                                      
 
+#======================================================================================
+#   C O M P I L E D    K E R N E L S
+#======================================================================================
+# The kernels below run the agglomeration on a CSR representation of the
+# network. The frontier is kept as a per-node count of module neighbors
+# that is updated incrementally, so an iteration only scans flat arrays:
+#
+#   * 'numba' : explicit loops compiled with numba (optional dependency)
+#   * 'numpy' : vectorized fallback used when numba is not installed
+#   * 'python': the original dictionary based implementation
+#
+# All kernels return the same p-values. Ties are broken by the position
+# of the node in G.nodes() instead of by set iteration order.
+KERNELS = ('auto', 'numba', 'numpy', 'python')
+
+
+def _jit(func):
+    if numba is None:
+        return func
+    # the on-disk cache records the importing module name, so it is only
+    # used for "from DIAMOnD.DIAMOnD import ..." (as in the pipeline) and
+    # not when this file is run as a script or imported as "DIAMOnD"
+    return numba.njit(cache=__name__ == 'DIAMOnD.DIAMOnD')(func)
+
+
+class CSRNetwork:
+    """
+    Compressed sparse row view of a networkx graph. Building it is O(E)
+    so it pays off to create it once and reuse it for several runs.
+
+    * node_names : node labels, position i belongs to index i
+    * node_index : label -> index
+    * indptr, indices : neighbors of node i are indices[indptr[i]:indptr[i+1]]
+    * degrees : G.degree() of every node
+    """
+
+    def __init__(self, G):
+        self.node_names = list(G.nodes())
+        self.node_index = {node: i for i, node in enumerate(self.node_names)}
+        self.indptr = np.zeros(len(self.node_names) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(G.adj[node]) for node in self.node_names])
+        self.indices = np.fromiter((self.node_index[neighbor]
+                                    for node in self.node_names
+                                    for neighbor in G.adj[node]),
+                                   dtype=np.int64, count=int(self.indptr[-1]))
+        self.degrees = np.fromiter((d for _, d in G.degree(self.node_names)),
+                                   dtype=np.int64, count=len(self.node_names))
+
+    def nodes(self):
+        return self.node_names
+
+    def number_of_nodes(self):
+        return len(self.node_names)
+
+    def __contains__(self, node):
+        return node in self.node_index
+
+    def __len__(self):
+        return len(self.node_names)
+
+
+def resolve_kernel(kernel):
+    """
+    Maps 'auto' to the fastest available kernel and checks the choice.
+    """
+    if kernel not in KERNELS:
+        raise ValueError("unknown DIAMOnD kernel %r, choose one of %s" % (kernel, KERNELS))
+    if kernel == 'auto':
+        return 'numba' if numba is not None else 'numpy'
+    if kernel == 'numba' and numba is None:
+        raise ImportError("the 'numba' kernel requires numba, use kernel='numpy' instead")
+    return kernel
+
+
+def compute_all_gamma_ln_array(N):
+    """
+    precomputes all logarithmic gammas as an array, gamma_ln[i] = ln(Gamma(i))
+    """
+    gamma_ln = np.empty(N + 1, dtype=np.float64)
+    gamma_ln[0] = np.inf
+    gamma_ln[1:] = scipy.special.gammaln(np.arange(1, N + 1))
+    return gamma_ln
+
+
+# -------------------------------------------------------------------------------------
+# numba kernel
+# -------------------------------------------------------------------------------------
+@_jit
+def _extend_gamma_ln(gamma_ln, N):
+    """
+    Returns gamma_ln grown (with some headroom) so that it covers N+1.
+    """
+    if N + 1 < gamma_ln.shape[0]:
+        return gamma_ln
+    extended = np.empty(2 * (N + 2), dtype=np.float64)
+    extended[:gamma_ln.shape[0]] = gamma_ln
+    for i in range(gamma_ln.shape[0], extended.shape[0]):
+        extended[i] = math.lgamma(i)
+    return extended
+
+
+@_jit
+def _logchoose_table(n, k, gamma_ln):
+    if n - k + 1 <= 0:
+        return np.inf
+    return gamma_ln[n + 1] - (gamma_ln[n - k + 1] + gamma_ln[k + 1])
+
+
+@_jit
+def _pvalue_table(kb, k, N, s, gamma_ln):
+    p = 0.0
+    for n in range(kb, k + 1):
+        if n > s:
+            break
+        p += np.exp(_logchoose_table(s, n, gamma_ln) +
+                    _logchoose_table(N - s, k - n, gamma_ln) -
+                    _logchoose_table(N, k, gamma_ln))
+    if p > 1:
+        return 1.0
+    return p
+
+
+@_jit
+def _diamond_csr_loops(indptr, indices, degrees, seeds, X, alpha, N_offset, s0, gamma_ln,
+                       local):
+    n_nodes = degrees.shape[0]
+    in_cluster = np.zeros(n_nodes, dtype=np.bool_)
+    kb = np.zeros(n_nodes, dtype=np.int64)
+    for seed in seeds:
+        in_cluster[seed] = True
+    for seed in seeds:
+        for j in range(indptr[seed], indptr[seed + 1]):
+            kb[indices[j]] += 1
+    cluster_size = seeds.shape[0]
+
+    # the universe is either the whole network or the module plus its
+    # frontier, in which case k only counts the links inside it
+    in_universe = np.ones(n_nodes, dtype=np.bool_)
+    universe_size = n_nodes
+    deg = degrees
+    if local:
+        in_universe = in_cluster | (kb > 0)
+        universe_size = 0
+        deg = np.zeros(n_nodes, dtype=np.int64)
+        for v in range(n_nodes):
+            if in_universe[v]:
+                universe_size += 1
+                for j in range(indptr[v], indptr[v + 1]):
+                    deg[indices[j]] += 1
+
+    max_k = 0
+    for v in range(n_nodes):
+        max_k = max(max_k, degrees[v] + (alpha - 1) * degrees[v])
+    best_kb = np.full(max_k + 1, -1, dtype=np.int64)
+    p_of_k = np.empty(max_k + 1, dtype=np.float64)
+
+    added = np.empty(X, dtype=np.int64)
+    added_k = np.empty(X, dtype=np.int64)
+    added_kb = np.empty(X, dtype=np.int64)
+    added_p = np.empty(X, dtype=np.float64)
+    n_added = 0
+    while n_added < X:
+        N = universe_size + N_offset
+        gamma_ln = _extend_gamma_ln(gamma_ln, N)
+
+        # (k, kb) reduction: a node can only win if no node with a smaller
+        # or equal degree has at least as many module neighbors
+        k_max = -1
+        for v in range(n_nodes):
+            if in_cluster[v] or kb[v] == 0:
+                continue
+            k_v = deg[v] + (alpha - 1) * kb[v]
+            best_kb[k_v] = max(best_kb[k_v], alpha * kb[v])
+            k_max = max(k_max, k_v)
+        if k_max < 0:
+            break
+        front_kb = -1
+        for k_v in range(k_max + 1):
+            if best_kb[k_v] > front_kb:
+                front_kb = best_kb[k_v]
+                p_of_k[k_v] = _pvalue_table(best_kb[k_v], k_v, N, s0, gamma_ln)
+            else:
+                p_of_k[k_v] = np.inf
+
+        # p-value lookup and argmin over the frontier
+        pmin = 10.0
+        next_node = -1
+        for v in range(n_nodes):
+            if in_cluster[v] or kb[v] == 0:
+                continue
+            k_v = deg[v] + (alpha - 1) * kb[v]
+            if alpha * kb[v] == best_kb[k_v] and p_of_k[k_v] < pmin:
+                pmin = p_of_k[k_v]
+                next_node = v
+        best_kb[:k_max + 1] = -1
+        if next_node < 0:
+            break
+
+        added[n_added] = next_node
+        added_k[n_added] = deg[next_node] + (alpha - 1) * kb[next_node]
+        added_kb[n_added] = alpha * kb[next_node]
+        added_p[n_added] = pmin
+        n_added += 1
+
+        # frontier (and universe) maintenance
+        in_cluster[next_node] = True
+        cluster_size += 1
+        s0 = cluster_size
+        for j in range(indptr[next_node], indptr[next_node + 1]):
+            u = indices[j]
+            kb[u] += 1
+            if not in_universe[u]:
+                in_universe[u] = True
+                universe_size += 1
+                for i in range(indptr[u], indptr[u + 1]):
+                    deg[indices[i]] += 1
+
+    return added[:n_added], added_k[:n_added], added_kb[:n_added], added_p[:n_added]
+
+
+# -------------------------------------------------------------------------------------
+# numpy kernel
+# -------------------------------------------------------------------------------------
+def _csr_neighbors(indptr, indices, nodes):
+    """
+    Concatenated neighbor lists of nodes.
+    """
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    slots = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return indices[slots]
+
+
+def _logchoose_array(n, k, gamma_ln):
+    n, k = np.broadcast_arrays(n, k)
+    defined = n - k + 1 > 0
+    lgn1 = gamma_ln[np.where(defined, n + 1, 1)]
+    lgnk1 = gamma_ln[np.where(defined, n - k + 1, 1)]
+    lgk1 = gamma_ln[np.where(defined, k + 1, 1)]
+    return np.where(defined, lgn1 - (lgnk1 + lgk1), np.inf)
+
+
+def _pvalue_array(kb, k, N, s, gamma_ln):
+    """
+    Vectorized pvalue() for arrays of (kb, k) pairs. The terms of every
+    row are summed sequentially so the result matches the scalar version.
+    """
+    upper = np.minimum(k, s)
+    span = int(max(0, (upper - kb).max() + 1))
+    if span == 0:
+        return np.zeros(len(k), dtype=np.float64)
+    n = kb[:, None] + np.arange(span)[None, :]
+    valid = n <= upper[:, None]
+    n = np.where(valid, n, 0)
+    # logchoose(s, n) only depends on n, so it is tabulated once
+    lc_s = _logchoose_array(s, np.arange(s + 1), gamma_ln)
+    with np.errstate(over='ignore', invalid='ignore'):
+        prob = np.exp(lc_s[n] +
+                      _logchoose_array(N - s, np.where(valid, k[:, None] - n, 0), gamma_ln) -
+                      _logchoose_array(N, k, gamma_ln)[:, None])
+    p = np.cumsum(np.where(valid, prob, 0.0), axis=1)[:, -1]
+    return np.where(p > 1, 1.0, p)
+
+
+def _diamond_csr_numpy(indptr, indices, degrees, seeds, X, alpha, N_offset, s0, gamma_ln,
+                       local):
+    n_nodes = degrees.shape[0]
+    in_cluster = np.zeros(n_nodes, dtype=bool)
+    in_cluster[seeds] = True
+    kb = np.bincount(_csr_neighbors(indptr, indices, seeds), minlength=n_nodes)
+    cluster_size = len(seeds)
+
+    # the universe is either the whole network or the module plus its
+    # frontier, in which case k only counts the links inside it
+    universe_size = n_nodes
+    deg = degrees
+    if local:
+        in_universe = in_cluster | (kb > 0)
+        universe_size = int(in_universe.sum())
+        deg = np.bincount(_csr_neighbors(indptr, indices, np.flatnonzero(in_universe)),
+                          minlength=n_nodes)
+
+    added, added_k, added_kb, added_p = [], [], [], []
+    while len(added) < X:
+        N = universe_size + N_offset
+        gamma_ln = _extend_gamma_ln(gamma_ln, N)
+        frontier = np.flatnonzero((kb > 0) & ~in_cluster)
+        if frontier.size == 0:
+            break
+        k = deg[frontier] + (alpha - 1) * kb[frontier]
+        kb_w = alpha * kb[frontier]
+
+        # (k, kb) reduction: a node can only win if no node with a smaller
+        # or equal degree has at least as many module neighbors
+        best_kb = np.full(k.max() + 1, -1, dtype=np.int64)
+        np.maximum.at(best_kb, k, kb_w)
+        ks = np.flatnonzero(best_kb >= 0)
+        front = best_kb[ks] > np.concatenate(([-1], np.maximum.accumulate(best_kb[ks])[:-1]))
+        ks = ks[front]
+        p_of_k = np.full(len(best_kb), np.inf)
+        p_of_k[ks] = _pvalue_array(best_kb[ks], ks, N, s0, gamma_ln)
+
+        # p-value lookup and argmin over the frontier
+        p = np.where(kb_w == best_kb[k], p_of_k[k], np.inf)
+        i = int(np.argmin(p))
+        next_node = frontier[i]
+        added.append(next_node)
+        added_k.append(k[i])
+        added_kb.append(kb_w[i])
+        added_p.append(p[i])
+
+        # frontier (and universe) maintenance
+        in_cluster[next_node] = True
+        cluster_size += 1
+        s0 = cluster_size
+        neighbors = indices[indptr[next_node]:indptr[next_node + 1]]
+        np.add.at(kb, neighbors, 1)
+        if local:
+            entering = np.unique(neighbors[~in_universe[neighbors]])
+            in_universe[entering] = True
+            universe_size += len(entering)
+            np.add.at(deg, _csr_neighbors(indptr, indices, entering), 1)
+
+    return (np.array(added, dtype=np.int64), np.array(added_k, dtype=np.int64),
+            np.array(added_kb, dtype=np.int64), np.array(added_p, dtype=np.float64))
+
+
+UNIVERSES = ('network', 'local')
+
+
+def diamond_iteration_csr(G, S, X, alpha, kernel='auto', universe='network',
+                          lookup_store=None):
+    """
+    Same as diamond_iteration_of_first_X_nodes() but runs on a CSRNetwork
+    (a networkx graph is converted on the fly) with a compiled or
+    vectorized kernel. If the module cannot grow any further, fewer than
+    X nodes are returned.
+
+    universe selects the hypergeometric background:
+      * 'network': all N nodes of the network, as in the original DIAMOnD
+      * 'local'  : only the current module and its frontier (in the
+                   spirit of DiaBLE). N, s0 and k are restricted to this
+                   universe and updated as it grows, and the log-gamma
+                   table is only extended as far as the universe needs.
+
+    lookup_store is an optional HypergeomLookupStore (see
+    hypergeom_store.py) that provides the log-gamma table instead of
+    recomputing it.
+    """
+    kernel = resolve_kernel(kernel)
+    if kernel == 'python':
+        raise ValueError("diamond_iteration_csr() needs the 'numba' or 'numpy' kernel")
+    if universe not in UNIVERSES:
+        raise ValueError("unknown universe %r, choose one of %s" % (universe, UNIVERSES))
+    if not isinstance(G, CSRNetwork):
+        G = CSRNetwork(G)
+
+    seeds = np.array(sorted(G.node_index[node] for node in S), dtype=np.int64)
+    N = G.number_of_nodes()
+    s0 = len(seeds)
+    s0 += (alpha-1)*s0
+    N_offset = (alpha-1)*s0
+    if lookup_store is not None:
+        # the kernels may grow their table, so they work on a copy
+        lookup_store.gamma_ln(N+N_offset+1 if universe == 'network' else 1)
+        gamma_ln = np.array(lookup_store.gamma_ln())
+    elif universe == 'network':
+        gamma_ln = compute_all_gamma_ln_array(N+N_offset+1)
+    else:
+        gamma_ln = compute_all_gamma_ln_array(1)
+
+    run_kernel = _diamond_csr_loops if kernel == 'numba' else _diamond_csr_numpy
+    added, added_k, added_kb, added_p = run_kernel(G.indptr, G.indices, G.degrees, seeds,
+                                                   int(X), int(alpha), N_offset, s0, gamma_ln,
+                                                   universe == 'local')
+    return [(G.node_names[v], int(k), int(kb), float(p))
+            for v, k, kb, p in zip(added, added_k, added_kb, added_p)]
+
 #======================================================================================
 #   C O R E    A L G O R I T H M
 #======================================================================================
-def diamond_iteration_of_first_X_nodes(G,S,X,alpha):
+def diamond_iteration_of_first_X_nodes(G,S,X,alpha,kernel='auto',universe='network',
+                                       lookup_store=None):
     
     """
 
@@ -256,6 +641,11 @@ def diamond_iteration_of_first_X_nodes(G,S,X,alpha):
     - X:     the number of iterations, i.e only the first X gened will be
              pulled in
     - alpha: seeds weight
+    - kernel: 'auto', 'numba', 'numpy' or 'python', see KERNELS
+    - universe: 'network' or 'local' background, see diamond_iteration_csr()
+    - lookup_store: optional HypergeomLookupStore with persistent
+             log-gammas and p-values (the p-values are only used by
+             the 'python' kernel)
 
     Returns:                                                                        
     --------
@@ -270,6 +660,13 @@ def diamond_iteration_of_first_X_nodes(G,S,X,alpha):
 
     """
     
+    if resolve_kernel(kernel) != 'python':
+        return diamond_iteration_csr(G,S,X,alpha,kernel,universe,lookup_store)
+    if isinstance(G, CSRNetwork):
+        raise ValueError("the 'python' kernel needs a networkx graph")
+    if universe != 'network':
+        raise ValueError("the 'python' kernel only supports universe='network'")
+
     N = G.number_of_nodes()
 
     added_nodes = []
@@ -295,7 +692,10 @@ def diamond_iteration_of_first_X_nodes(G,S,X,alpha):
     # ------------------------------------------------------------------
     # precompute the logarithmic gamma functions
     # ------------------------------------------------------------------
-    gamma_ln = compute_all_gamma_ln(N+1)
+    if lookup_store is not None:
+        gamma_ln = lookup_store.gamma_ln(N+1)
+    else:
+        gamma_ln = compute_all_gamma_ln(N+1)
     
     # ------------------------------------------------------------------
     # Setting initial set of nodes not in cluster
@@ -311,7 +711,10 @@ def diamond_iteration_of_first_X_nodes(G,S,X,alpha):
     #
     # ------------------------------------------------------------------
 
-    all_p = {}
+    if lookup_store is not None:
+        all_p = lookup_store.pvalues(N, alpha)
+    else:
+        all_p = {}
 
     while len(added_nodes) < X:    
 
@@ -369,7 +772,8 @@ def diamond_iteration_of_first_X_nodes(G,S,X,alpha):
 #   M A I N    D I A M O n D    A L G O R I T H M
 # 
 # ===========================================================================
-def DIAMOnD(G_original,seed_genes,max_number_of_added_nodes,alpha,outfile = None):
+def DIAMOnD(G_original,seed_genes,max_number_of_added_nodes,alpha,outfile = None,kernel='auto',
+            universe='network',lookup_store=None):
 
     """
     Runs the DIAMOnD algorithm
@@ -385,8 +789,15 @@ def DIAMOnD(G_original,seed_genes,max_number_of_added_nodes,alpha,outfile = None
      - alpha:
              given weight to the sees
      - outfile:
-             filename for the output generates by the algorithm,
-             if not given the program will name it 'first_x_added_nodes.txt'
+             filename (or writer) for the output generated by the
+             algorithm, if not given nothing is written
+     - kernel:
+             implementation of the main loop, see KERNELS
+     - universe:
+             hypergeometric background, 'network' or 'local' (module
+             plus frontier), see diamond_iteration_csr()
+     - lookup_store:
+             optional HypergeomLookupStore, see hypergeom_store.py
 
      Returns:
      --------
@@ -399,32 +810,112 @@ def DIAMOnD(G_original,seed_genes,max_number_of_added_nodes,alpha,outfile = None
     """
     
     # 1. throwing away the seed genes that are not in the network
-    all_genes_in_network = set(G_original.nodes())
+    disease_genes = seed_genes_in_network(G_original, seed_genes)
+
+    # 2. agglomeration algorithm. 
+    added_nodes = diamond_iteration_of_first_X_nodes(G_original,
+                                                     disease_genes,
+                                                     max_number_of_added_nodes,alpha,
+                                                     kernel,universe,lookup_store)
+    # 3. saving the results 
+    if outfile is not None:
+        write_added_nodes(added_nodes, outfile)
+
+    return added_nodes
+
+
+# ===========================================================================
+def seed_genes_in_network(G, seed_genes):
+    """
+    Returns the seed genes that are part of the network, reporting how
+    many of them had to be ignored.
+    """
+    all_genes_in_network = set(G.nodes())
     seed_genes = set(seed_genes)
     disease_genes = seed_genes & all_genes_in_network
 
     if len(disease_genes) != len(seed_genes):
         print("DIAMOnD(): ignoring %s of %s seed genes that are not in the network" %(
             len(seed_genes - all_genes_in_network), len(seed_genes)))
-   
 
+    return disease_genes
 
- 
-    # 2. agglomeration algorithm. 
+
+# ===========================================================================
+def write_added_nodes(added_nodes, outfile):
+    """
+    Saves the agglomerated nodes as a '#rank  DIAMOnD_node' table.
+
+    outfile is either a filename or an already opened writer (anything
+    with a write() method such as sys.stdout or io.StringIO). Writers
+    are left open so results can be streamed into a shared handle.
+    """
+    if hasattr(outfile, 'write'):
+        _print_added_nodes(added_nodes, outfile)
+    else:
+        with open(outfile, 'w') as fout:
+            _print_added_nodes(added_nodes, fout)
+
+
+def _print_added_nodes(added_nodes, fout):
+    print('\t'.join(['#rank','DIAMOnD_node']), file=fout)
+    for rank, DIAMOnD_node_info in enumerate(added_nodes, start=1):
+        DIAMOnD_node = DIAMOnD_node_info[0]
+        print('\t'.join(map(str,([rank,DIAMOnD_node]))), file=fout)
+
+
+# ===========================================================================
+#
+# run_diamond: side-effect free entry point
+#
+# ===========================================================================
+DIAMOnDResult = namedtuple('DIAMOnDResult', ['seed_genes', 'nodes', 'k', 'kb', 'p'])
+
+
+def run_diamond(G_original, seed_genes, max_number_of_added_nodes, alpha=1, outfile=None,
+                kernel='auto', universe='network', lookup_store=None):
+    """
+    Runs DIAMOnD on an in-memory network and returns the ranked
+    results as arrays. Nothing is written unless outfile is given.
+
+    Input:
+    ------
+     - G_original : the network, either a networkx graph or a CSRNetwork
+     - seed_genes : iterable of seed genes
+     - max_number_of_added_nodes : after how many added nodes to stop
+     - alpha : given weight to the seeds
+     - outfile : optional filename or writer, see write_added_nodes()
+     - kernel : implementation of the main loop, see KERNELS
+     - universe : 'network' or 'local' background, see diamond_iteration_csr()
+     - lookup_store : optional HypergeomLookupStore, see hypergeom_store.py
+
+     Returns:
+     --------
+      - DIAMOnDResult with
+            * seed_genes : the seed genes that are in the network
+            * nodes      : added nodes in the order of agglomeration
+            * k          : degree of each added node
+            * kb         : number of module neighbors at agglomeration
+            * p          : connectivity p-value at agglomeration
+    """
+    disease_genes = seed_genes_in_network(G_original, seed_genes)
     added_nodes = diamond_iteration_of_first_X_nodes(G_original,
                                                      disease_genes,
-                                                     max_number_of_added_nodes,alpha)
-    # 3. saving the results 
-    with open(outfile,'w') as fout:
-        print('\t'.join(['#rank','DIAMOnD_node']), file=fout)
-        rank = 0
-        for DIAMOnD_node_info in added_nodes:
-            rank += 1
-            DIAMOnD_node = DIAMOnD_node_info[0]
-            p = float(DIAMOnD_node_info[3].item())
-            print('\t'.join(map(str,([rank,DIAMOnD_node]))), file=fout)
-
-    return added_nodes
+                                                     max_number_of_added_nodes, alpha,
+                                                     kernel, universe, lookup_store)
+    if outfile is not None:
+        write_added_nodes(added_nodes, outfile)
+
+    nodes = np.empty(len(added_nodes), dtype=object)
+    nodes[:] = [info[0] for info in added_nodes]
+    return DIAMOnDResult(
+        seed_genes=disease_genes,
+        nodes=nodes,
+        k=np.array([info[1] for info in added_nodes], dtype=np.int64),
+        kb=np.array([info[2] for info in added_nodes], dtype=np.int64),
+        p=np.array([np.asarray(info[3], dtype=np.float64).item() for info in added_nodes],
+                   dtype=np.float64),
+    )
 
 # ===========================================================================
 #
@@ -437,6 +928,9 @@ def run_diamond_from_args(args=None):
     Run DIAMOnD from another script by passing arguments as a list.
     Args must follow this order:
         [network_file, seed_file, n, (optional) alpha, (optional) outfile_name]
+
+    This mirrors the command line and always writes outfile_name; use
+    run_diamond() to keep the results in memory.
     """
     if args is None:
         args = sys.argv
@@ -0,0 +1,112 @@
+#! /usr/bin/env python
+
+
+"""
+# -----------------------------------------------------------------------
+# benchmark_local_universe.py
+
+# Compares the local-universe variant of DIAMOnD (background = module
+# plus frontier, in the spirit of DiaBLE) against the standard DIAMOnD()
+# that uses the whole network as background.
+#
+# For every variant the wall time is reported, and for the local variant
+# the overlap of its ranking with the standard one at several cutoffs.
+# -----------------------------------------------------------------------
+"""
+
+import sys
+import time
+
+from DIAMOnD import CSRNetwork, DIAMOnD, read_input, resolve_kernel, run_diamond
+
+
+# =============================================================================
+def print_usage():
+
+    print(' ')
+    print('        usage: ./benchmark_local_universe.py network_file seed_file n repeats(optional)')
+    print('        -----------------------------------------------------------------')
+    print('        network_file : edgelist, same format as for DIAMOnD.py')
+    print('        seed_file    : seed genes, same format as for DIAMOnD.py')
+    print('        n            : number of DIAMOnD genes to add')
+    print('        repeats      : number of timed runs per variant, the fastest')
+    print('                       one is reported. Default is 1')
+    print(' ')
+
+
+# =============================================================================
+def time_call(repeats, func, *args, **kwargs):
+    """
+    Returns the fastest wall time out of repeats calls and the last result.
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+# =============================================================================
+def overlap_at(ranking_a, ranking_b, cutoff):
+    """
+    Fraction of shared nodes among the first cutoff nodes of both rankings.
+    """
+    cutoff = min(cutoff, len(ranking_a), len(ranking_b))
+    if cutoff == 0:
+        return 0.0
+    return len(set(ranking_a[:cutoff]) & set(ranking_b[:cutoff])) / float(cutoff)
+
+
+# =============================================================================
+def benchmark(G, seed_genes, n, repeats=1):
+    """
+    Runs the standard and the local-universe DIAMOnD and returns a list
+    of (variant, seconds, ranking) tuples. The standard run with the
+    original 'python' kernel comes first and serves as reference.
+    """
+    kernel = resolve_kernel('auto')
+    csr = CSRNetwork(G)
+    # compile / warm up the kernels outside of the timed runs
+    run_diamond(csr, seed_genes, 1, kernel=kernel)
+    run_diamond(csr, seed_genes, 1, kernel=kernel, universe='local')
+
+    variants = []
+    seconds, added_nodes = time_call(repeats, DIAMOnD, G, seed_genes, n, 1, kernel='python')
+    variants.append(('DIAMOnD() python kernel', seconds, [info[0] for info in added_nodes]))
+    seconds, added_nodes = time_call(repeats, DIAMOnD, G, seed_genes, n, 1, kernel=kernel)
+    variants.append(('DIAMOnD() %s kernel' % kernel, seconds, [info[0] for info in added_nodes]))
+    seconds, result = time_call(repeats, run_diamond, csr, seed_genes, n, kernel=kernel,
+                                universe='local')
+    variants.append(('local universe %s kernel' % kernel, seconds, list(result.nodes)))
+    return variants
+
+
+# =============================================================================
+def print_report(variants, n):
+    reference = variants[0][2]
+    cutoffs = sorted(set(c for c in (10, 50, 100, n) if c <= n))
+
+    print(' ')
+    print('\t'.join(['variant', 'seconds', 'speedup'] + ['overlap@%d' % c for c in cutoffs]))
+    for name, seconds, ranking in variants:
+        row = [name, '%.4f' % seconds, '%.1fx' % (variants[0][1] / max(seconds, 1e-9))]
+        row += ['%.2f' % overlap_at(reference, ranking, c) for c in cutoffs]
+        print('\t'.join(row))
+    print(' ')
+
+
+if __name__ == '__main__':
+
+    try:
+        network_edgelist_file = sys.argv[1]
+        seeds_file = sys.argv[2]
+        max_number_of_added_nodes = int(sys.argv[3])
+        repeats = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    except (IndexError, ValueError):
+        print_usage()
+        sys.exit(0)
+
+    G_original, seed_genes = read_input(network_edgelist_file, seeds_file)
+    variants = benchmark(G_original, seed_genes, max_number_of_added_nodes, repeats)
+    print_report(variants, max_number_of_added_nodes)
@@ -0,0 +1,177 @@
+"""
+# -----------------------------------------------------------------------
+# diamond_permutation.py
+
+# Empirical significance of DIAMOnD modules.
+#
+# DIAMOnD is rerun on random seed sets that preserve the degrees of the
+# real seeds (every seed is replaced by a random node from the same
+# degree bin). For every rank i of the real module, the empirical p-value
+# is the fraction of random runs whose i-th added node was connected at
+# least as significantly as the real one:
+#
+#   p_emp[i] = (1 + #{random runs with p_i <= observed p_i}) / (1 + runs)
+#
+# The random runs are batched over a process pool. Every worker receives
+# the CSR network once, when it starts, and afterwards only small arrays
+# of seed indices.
+# -----------------------------------------------------------------------
+"""
+
+from collections import namedtuple
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+
+from .DIAMOnD import (CSRNetwork, diamond_iteration_csr, resolve_kernel,
+                      seed_genes_in_network)
+
+
+# =============================================================================
+class DegreeBinIndex:
+    """
+    Groups the nodes of a network into bins of similar degree. Degrees are
+    visited in increasing order and a bin is closed as soon as it holds at
+    least min_bin_size nodes; a smaller remainder is merged into the last
+    bin. Nodes of the same degree always share a bin.
+
+    * bin_of_node : bin id of every node index
+    * bin_members : node indices of every bin
+    """
+
+    def __init__(self, degrees, min_bin_size=100):
+        degrees = np.asarray(degrees)
+        values, counts = np.unique(degrees, return_counts=True)
+        bin_of_value = np.empty(len(values), dtype=np.int64)
+        current_bin, current_size = 0, 0
+        for i, count in enumerate(counts):
+            bin_of_value[i] = current_bin
+            current_size += count
+            if current_size >= min_bin_size:
+                current_bin += 1
+                current_size = 0
+        if 0 < current_size and current_bin > 0:
+            bin_of_value[bin_of_value == current_bin] = current_bin - 1
+
+        self.bin_of_node = bin_of_value[np.searchsorted(values, degrees)]
+        order = np.argsort(self.bin_of_node, kind='stable')
+        bounds = np.searchsorted(self.bin_of_node[order], np.arange(self.bin_of_node.max() + 2))
+        self.bin_members = [order[bounds[b]:bounds[b + 1]] for b in range(len(bounds) - 1)]
+
+    def __len__(self):
+        return len(self.bin_members)
+
+    def sample(self, nodes, rng):
+        """
+        Draws a random node set in which every node of nodes is replaced by
+        a node of the same degree bin. Nodes are drawn without replacement
+        within a bin unless the bin is too small.
+        """
+        sample = []
+        bins, counts = np.unique(self.bin_of_node[nodes], return_counts=True)
+        for b, count in zip(bins, counts):
+            members = self.bin_members[b]
+            sample.append(rng.choice(members, size=count, replace=count > len(members)))
+        return np.concatenate(sample) if sample else np.empty(0, dtype=np.int64)
+
+
+# =============================================================================
+# process pool: the network is handed to every worker once
+# =============================================================================
+_network = None
+_run_params = None
+
+
+def _init_worker(network, X, alpha, kernel, universe):
+    global _network, _run_params
+    _network = network
+    _run_params = (X, alpha, kernel, universe)
+
+
+def _run_batch(seed_batch):
+    """
+    Runs DIAMOnD for every seed index array of the batch and returns the
+    p-values as a (len(seed_batch), X) matrix, padded with nan when a
+    module could not grow to X nodes.
+    """
+    X, alpha, kernel, universe = _run_params
+    null_p = np.full((len(seed_batch), X), np.nan)
+    for i, seeds in enumerate(seed_batch):
+        seed_names = [_network.node_names[v] for v in seeds]
+        added_nodes = diamond_iteration_csr(_network, seed_names, X, alpha, kernel, universe)
+        null_p[i, :len(added_nodes)] = [info[3] for info in added_nodes]
+    return null_p
+
+
+# =============================================================================
+PermutationResult = namedtuple('PermutationResult',
+                               ['seed_genes', 'nodes', 'p', 'empirical_p', 'null_p'])
+
+
+def diamond_permutation_test(G, seed_genes, max_number_of_added_nodes, alpha=1,
+                             n_permutations=1000, min_bin_size=100, processes=None,
+                             batch_size=50, random_state=None, kernel='auto',
+                             universe='network', degree_bins=None):
+    """
+    Runs DIAMOnD on the seed genes and on n_permutations degree-preserving
+    random seed sets and returns the empirical p-value of every added node.
+
+    Input:
+    ------
+     - G : the network, a networkx graph or a CSRNetwork
+     - seed_genes : iterable of seed genes
+     - max_number_of_added_nodes : size of the module to evaluate
+     - alpha : given weight to the seeds
+     - n_permutations : number of random seed sets
+     - min_bin_size : minimum number of nodes per degree bin
+     - processes : size of the process pool, defaults to all cores;
+                   1 runs everything in the calling process
+     - batch_size : number of random runs sent to a worker at once
+     - random_state : seed or numpy Generator for reproducible draws
+     - kernel, universe : see diamond_iteration_csr()
+     - degree_bins : a precomputed DegreeBinIndex of the network, to
+                     share it across diseases
+
+     Returns:
+     --------
+      - PermutationResult with
+            * seed_genes  : seed genes that are in the network
+            * nodes       : added nodes in the order of agglomeration
+            * p           : their connectivity p-values
+            * empirical_p : empirical p-value of every rank
+            * null_p      : (n_permutations, n) p-values of the random runs
+    """
+    kernel = resolve_kernel(kernel)
+    network = G if isinstance(G, CSRNetwork) else CSRNetwork(G)
+    if degree_bins is None:
+        degree_bins = DegreeBinIndex(network.degrees, min_bin_size)
+    rng = np.random.default_rng(random_state)
+    processes = processes if processes is not None else cpu_count()
+
+    disease_genes = seed_genes_in_network(network, seed_genes)
+    added_nodes = diamond_iteration_csr(network, disease_genes, max_number_of_added_nodes,
+                                        alpha, kernel, universe)
+    X = len(added_nodes)
+    observed_p = np.array([info[3] for info in added_nodes], dtype=np.float64)
+
+    seed_index = np.array(sorted(network.node_index[node] for node in disease_genes),
+                          dtype=np.int64)
+    random_seeds = [degree_bins.sample(seed_index, rng) for _ in range(n_permutations)]
+    batches = [random_seeds[i:i + batch_size] for i in range(0, n_permutations, batch_size)]
+
+    init_args = (network, X, alpha, kernel, universe)
+    if processes == 1:
+        _init_worker(*init_args)
+        null_batches = [_run_batch(batch) for batch in batches]
+    else:
+        with Pool(processes=processes, initializer=_init_worker, initargs=init_args) as pool:
+            null_batches = pool.map(_run_batch, batches)
+    null_p = np.vstack(null_batches) if null_batches else np.empty((0, X))
+
+    as_extreme = (null_p <= observed_p[None, :]).sum(axis=0)
+    empirical_p = (1.0 + as_extreme) / (1.0 + n_permutations)
+
+    nodes = np.empty(X, dtype=object)
+    nodes[:] = [info[0] for info in added_nodes]
+    return PermutationResult(seed_genes=disease_genes, nodes=nodes, p=observed_p,
+                             empirical_p=empirical_p, null_p=null_p)
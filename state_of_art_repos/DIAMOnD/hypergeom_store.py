@@ -0,0 +1,222 @@
+"""
+# -----------------------------------------------------------------------
+# hypergeom_store.py
+
+# Disk-backed lookup tables for the DIAMOnD p-value computation.
+#
+# For a fixed interactome every DIAMOnD run tabulates the same
+# logarithmic gammas and hits largely the same p-values, so both are kept
+# in a directory:
+#
+#   gamma_ln.npy                       ln(Gamma(i)) for i = 0, 1, ...
+#                                      (memory-mapped when loaded)
+#   pvalues_N<N>_alpha<alpha>.npz      keys, values and hits of the
+#                                      p-values keyed by (k, kb, s0) for
+#                                      a background of N nodes and seed
+#                                      weight alpha
+#
+# ln(Gamma(i)) does not depend on N, so a single gamma table is shared
+# and grown to the largest N requested. New p-values are kept in memory
+# and merged into the files by save(); when a table would exceed
+# max_pvalues entries, the least often hit ones are dropped.
+#
+# Every table is a single file that is replaced atomically, so concurrent
+# runs only ever see complete tables (the last save() wins).
+# -----------------------------------------------------------------------
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import scipy.special
+
+# (k, kb, s0) are packed into one int64 with 21 bits per value
+_KEY_BITS = 21
+_KEY_LIMIT = 1 << _KEY_BITS
+
+
+def _pack(k, kb, s0):
+    if not (0 <= k < _KEY_LIMIT and 0 <= kb < _KEY_LIMIT and 0 <= s0 < _KEY_LIMIT):
+        return None
+    return (int(s0) << (2 * _KEY_BITS)) | (int(k) << _KEY_BITS) | int(kb)
+
+
+def _save_atomic(path, array=None, **arrays):
+    """
+    Writes one array (.npy) or several named arrays (.npz) to a temporary
+    file and renames it to path.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if array is not None:
+                np.save(f, array)
+            else:
+                np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _load(path, dtype):
+    if os.path.exists(path):
+        return np.load(path, mmap_mode='r')
+    return np.empty(0, dtype=dtype)
+
+
+def _load_table(path):
+    """
+    Returns the keys, values and hits of a p-value table file (empty if
+    there is none).
+    """
+    if os.path.exists(path):
+        with np.load(path) as table:
+            return table['keys'], table['values'], table['hits']
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64)
+
+
+# =============================================================================
+class PValueTable:
+    """
+    Mapping (k, kb, s0) -> p-value that can replace the all_p dictionary
+    of diamond_iteration_of_first_X_nodes(). Lookups go to the entries of
+    this session first and then to the persistent entries;
+    assignments are kept in memory until the store is saved.
+    """
+
+    def __init__(self, keys, values, hits):
+        self._keys = keys
+        self._values = values
+        self._stored_hits = hits
+        self._memo = {}
+        self._hits = {}
+        self._new = set()
+
+    def __getitem__(self, key):
+        packed = _pack(*key)
+        if packed is None:
+            raise KeyError(key)
+        if packed not in self._memo:
+            i = np.searchsorted(self._keys, packed)
+            if i == len(self._keys) or self._keys[i] != packed:
+                raise KeyError(key)
+            self._memo[packed] = float(self._values[i])
+        self._hits[packed] = self._hits.get(packed, 0) + 1
+        return self._memo[packed]
+
+    def __setitem__(self, key, p):
+        packed = _pack(*key)
+        if packed is None:
+            return
+        self._memo[packed] = float(np.asarray(p, dtype=np.float64).item())
+        self._hits[packed] = self._hits.get(packed, 0) + 1
+        self._new.add(packed)
+
+    def __len__(self):
+        return len(self._keys) + len(self._new)
+
+    @property
+    def dirty(self):
+        """
+        True if entries were added since the table was loaded. Hits of
+        stored entries alone do not make it dirty; they are written with
+        the next new entries.
+        """
+        return bool(self._new)
+
+    def merged(self, max_entries):
+        """
+        Returns the persistent and the new entries as sorted (keys, values,
+        hits) arrays, keeping the max_entries most often hit ones.
+        """
+        hits = np.array(self._stored_hits, dtype=np.int64)
+        if self._hits:
+            session_keys = np.fromiter(self._hits, dtype=np.int64, count=len(self._hits))
+            session_hits = np.fromiter(self._hits.values(), dtype=np.int64, count=len(self._hits))
+            stored = np.isin(session_keys, self._keys)
+            np.add.at(hits, np.searchsorted(self._keys, session_keys[stored]), session_hits[stored])
+
+        new_keys = np.fromiter(self._new, dtype=np.int64, count=len(self._new))
+        keys = np.concatenate([np.asarray(self._keys), new_keys])
+        values = np.concatenate([np.asarray(self._values),
+                                 np.array([self._memo[k] for k in new_keys], dtype=np.float64)])
+        hits = np.concatenate([hits, np.array([self._hits[k] for k in new_keys], dtype=np.int64)])
+
+        if len(keys) > max_entries:
+            keep = np.argsort(-hits, kind='stable')[:max_entries]
+            keys, values, hits = keys[keep], values[keep], hits[keep]
+        order = np.argsort(keys)
+        return keys[order], values[order], hits[order]
+
+
+# =============================================================================
+class HypergeomLookupStore:
+    """
+    Directory of persistent log-gamma and p-value tables, see the module
+    docstring. Pass it as lookup_store to DIAMOnD() / run_diamond() and
+    call save() to persist what the runs added.
+    """
+
+    def __init__(self, directory, max_pvalues=1000000):
+        self.directory = directory
+        self.max_pvalues = max_pvalues
+        os.makedirs(directory, exist_ok=True)
+        self._gamma_ln = _load(self._path('gamma_ln'), np.float64)
+        self._gamma_grown = False
+        self._tables = {}
+
+    def _path(self, name, extension='.npy'):
+        return os.path.join(self.directory, name + extension)
+
+    @property
+    def dirty(self):
+        """
+        True if save() has anything to write.
+        """
+        return self._gamma_grown or any(table.dirty for table in self._tables.values())
+
+    def gamma_ln(self, N=None):
+        """
+        Returns ln(Gamma(i)) for i = 0..N (the whole table if N is None),
+        extending the table first if it is too short. gamma_ln[0] is inf.
+        """
+        if N is not None and len(self._gamma_ln) <= N:
+            start = len(self._gamma_ln)
+            extension = np.empty(N + 1 - start, dtype=np.float64)
+            if start == 0:
+                extension[0] = np.inf
+                extension[1:] = scipy.special.gammaln(np.arange(1, N + 1))
+            else:
+                extension[:] = scipy.special.gammaln(np.arange(start, N + 1))
+            self._gamma_ln = np.concatenate([np.asarray(self._gamma_ln), extension])
+            self._gamma_grown = True
+        return self._gamma_ln if N is None else self._gamma_ln[:N + 1]
+
+    def pvalues(self, N, alpha):
+        """
+        Returns the PValueTable for a background of N nodes and seed weight alpha.
+        """
+        if (N, alpha) not in self._tables:
+            name = 'pvalues_N%d_alpha%d' % (N, alpha)
+            self._tables[(N, alpha)] = PValueTable(*_load_table(self._path(name, '.npz')))
+        return self._tables[(N, alpha)]
+
+    def save(self):
+        """
+        Writes the grown gamma table and all p-value tables with new
+        entries, then reloads them.
+        """
+        if self._gamma_grown:
+            _save_atomic(self._path('gamma_ln'), self._gamma_ln)
+            self._gamma_ln = _load(self._path('gamma_ln'), np.float64)
+            self._gamma_grown = False
+
+        for (N, alpha), table in list(self._tables.items()):
+            if not table.dirty:
+                continue
+            name = 'pvalues_N%d_alpha%d' % (N, alpha)
+            keys, values, hits = table.merged(self.max_pvalues)
+            _save_atomic(self._path(name, '.npz'), keys=keys, values=values, hits=hits)
+            del self._tables[(N, alpha)]
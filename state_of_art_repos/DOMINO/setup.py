@@ -31,6 +31,7 @@ setup(
         "console_scripts": [
             "domino=src.runner:main_domino",
             "slicer=src.runner:main_slicer",
+            "slices-converter=src.runner:main_convert_slices",
         ]
     }
 
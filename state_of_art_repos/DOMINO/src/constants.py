@@ -3,7 +3,9 @@ import numpy as np
 import multiprocessing
 
 USE_CACHE=False
-N_OF_THREADS=40 # int(np.ceil(multiprocessing.cpu_count()*0.9))
+CACHE_DIR=os.path.join(os.path.expanduser("~"), ".cache", "domino") # network and slice graph cache, keyed by file content
+CACHE_MAX_BYTES=2*1024**3
+N_OF_THREADS=int(np.ceil(multiprocessing.cpu_count()*0.9)) # default size of DominoPool
 dir_path = os.path.dirname(os.path.realpath(__file__))
 PATH_TO_CONF = "env/config/conf.json"
 
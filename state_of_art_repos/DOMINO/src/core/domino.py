@@ -4,25 +4,92 @@ sys.path.insert(0, "../")
 
 import multiprocessing
 import os
-import pickle
 import random
-from functools import reduce
+from functools import partial, reduce
 
 import networkx as nx
 import numpy as np
 import pandas as pd
 import pcst_fast
+import scipy.sparse
 import src.constants as constants
-from networkx.algorithms.community.centrality import girvan_newman
 from networkx.algorithms.community.quality import modularity
 from networkx.algorithms.components import connected_components
 from scipy.stats import hypergeom
-from src.core.network_builder import build_network
-from src.core.preprocess_slices import read_preprocessed_slices
-from src.utils.graph_influence_linear_th import linear_threshold
+from src.core.network_builder import network_from_edges, read_network_edges
+from src.core.preprocess_slices import compute_slices, network_fingerprint, read_preprocessed_slices
+from src.utils.array_cache import ArrayCache, combined_digest, file_digest
+from src.utils.graph_influence_linear_th import linear_threshold_sparse
 from statsmodels.sandbox.stats.multicomp import fdrcorrection0
 
-G_modularity = None
+_worker_network = None
+_worker_nodes = None
+
+
+def _init_worker(network):
+    global _worker_network, _worker_nodes
+    _worker_network = network
+    _worker_nodes = list(network.nodes)
+
+
+def _run_task(func, task):
+    return func(_worker_network, _worker_nodes, task)
+
+
+class DominoPool:
+    """
+    Long-lived pool of worker processes (constants.N_OF_THREADS by default)
+    that receive the network once, when they start. Tasks only carry node
+    indices and the attributes of the nodes they need, so the same pool
+    serves every stage and every disease run on that network. With a single
+    process the tasks run in the calling process.
+
+    network: graph as built by domino_network(); node attributes are
+             ignored by the workers, so they may change between diseases
+    """
+
+    def __init__(self, network, processes=None):
+        self.network = network
+        # identifies the network the pool was created for, see run_domino()
+        self.fingerprint = network_fingerprint(network)
+        self.nodes = list(network.nodes)
+        self.node_index = {n: i for i, n in enumerate(self.nodes)}
+        self.processes = constants.N_OF_THREADS if processes is None else processes
+        self._pool = None
+        if self.processes != 1:
+            self._pool = multiprocessing.Pool(self.processes, initializer=_init_worker, initargs=(network,))
+
+    def indices(self, nodes):
+        return np.fromiter((self.node_index[n] for n in nodes), dtype=np.int64, count=len(nodes))
+
+    def map(self, func, tasks):
+        """
+        Returns [func(network, nodes, task) for task in tasks], computed by
+        the workers; nodes is the node list of the network.
+        """
+        if self._pool is None:
+            return [func(self.network, self.nodes, task) for task in tasks]
+        return self._pool.map(partial(_run_task, func), tasks)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def domino_network(G):
+    """
+    The network DOMINO runs on: the edges of G, with nodes in order of
+    appearance in them.
+    """
+    return nx.Graph(list(G.edges()))
 
 
 def extract_scores(scores_file):
@@ -35,6 +102,16 @@ def extract_scores(scores_file):
     return scores
 
 
+def active_genes_to_scores(active_genes):
+    """
+    In-memory counterpart of extract_scores(): active_genes is either an
+    iterable of genes (all scored 1) or a mapping gene -> score.
+    """
+    if hasattr(active_genes, 'items'):
+        return pd.DataFrame({"score": pd.Series(dict(active_genes.items()), dtype=object)})
+    return pd.DataFrame({"score": 1}, index=pd.Index(list(active_genes), dtype=object))
+
+
 def add_scores_to_nodes(G, scores):
     """"""
     inds = []
@@ -51,40 +128,111 @@ def add_scores_to_nodes(G, scores):
     return G
 
 
-def create_subgraph(G, params):
-    cur_module = params
-    nodes = set(cur_module)
-    res = G.subgraph(list(nodes))
-    return res
-
-
-def prune_network_by_modularity(G, modules, cache_file):
-    global G_modularity
-    if os.path.exists(cache_file) and constants.USE_CACHE:
-        print(f'fetch cache file for subnetworks {cache_file}')
-        G_modularity = pickle.load(open(cache_file, 'rb'))
-        for n in G_modularity:
-            G_modularity.nodes[n]['pertubed_node'] = G.nodes[n]['pertubed_node']
-        print('pkl is loaded')
-        return G_modularity
+class PerturbationStats:
+    """
+    Activeness of the nodes of a network, computed once per disease by
+    perturbation_stats(): a node -> index map into the boolean mask
+    is_pertubed, and the number of active nodes. Counting the active nodes
+    of a module with count_pertubed() only touches the module.
+    """
+
+    def __init__(self, nodes, is_pertubed):
+        self.node_index = {n: i for i, n in enumerate(nodes)}
+        self.is_pertubed = is_pertubed
+        self.n_nodes = len(is_pertubed)
+        self.n_pertubed = int(is_pertubed.sum())
+
+    def mask(self, nodes):
+        return self.is_pertubed[np.fromiter((self.node_index[n] for n in nodes), dtype=np.int64)]
+
+    def count_pertubed(self, nodes):
+        return int(self.mask(nodes).sum())
+
+    def restrict(self, nodes):
+        """
+        Stats of `nodes` only, with the totals of the whole network; this is
+        all a slice worker needs.
+        """
+        nodes = list(nodes)
+        stats = PerturbationStats(nodes, self.mask(nodes))
+        stats.n_nodes, stats.n_pertubed = self.n_nodes, self.n_pertubed
+        return stats
+
+
+def perturbation_stats(G):
+    """
+    PerturbationStats of a network whose nodes carry their activeness (see
+    add_scores_to_nodes()).
+    """
+    nodes = list(G.nodes)
+    return PerturbationStats(nodes, np.fromiter((bool(G.nodes[n]["pertubed_node"]) for n in nodes), dtype=bool,
+                                                count=len(nodes)))
+
+
+def slice_graph(G, modules):
+    """
+    Union of the subgraphs of G induced by the (disjoint) slices: the nodes
+    of the slices and the edges whose endpoints carry the same slice label.
+    """
+    return graph_from_indices(G, *slice_graph_indices(G, modules))
+
+
+def slice_graph_indices(G, modules):
+    """
+    The nodes and edges of slice_graph(G, modules) as indices into the
+    nodes of G: an array of node indices and an (n_edges, 2) array.
+    """
+    node_index = {n: i for i, n in enumerate(G.nodes)}
+    labels = np.full(len(node_index), -1, dtype=np.int64)
+    for i_module, module in enumerate(modules):
+        labels[[node_index[n] for n in module if n in node_index]] = i_module
+
+    edges = list(G.edges())
+    endpoints = np.fromiter((node_index[n] for e in edges for n in e), dtype=np.int64,
+                            count=2 * len(edges)).reshape(-1, 2)
+    edge_labels = labels[endpoints]
+    keep = (edge_labels[:, 0] == edge_labels[:, 1]) & (edge_labels[:, 0] >= 0)
+
+    sliced = np.flatnonzero(labels >= 0)
+    return sliced[np.argsort(labels[sliced], kind='stable')], endpoints[keep]
+
+
+def graph_from_indices(G, node_indices, edge_indices):
+    """
+    Graph of the given nodes and edges of G (as indices into its nodes),
+    with their attributes, added in the given order.
+    """
+    nodes = list(G.nodes)
+    H = nx.Graph()
+    H.add_nodes_from((nodes[i], G.nodes[nodes[i]]) for i in node_indices.tolist())
+    H.add_edges_from((nodes[a], nodes[b], G.adj[nodes[a]][nodes[b]]) for a, b in edge_indices.tolist())
+    return H
+
+
+def prune_network_by_modularity(G, modules, cache=None, cache_key=None):
+    """
+    slice_graph() of G, read from / written to an ArrayCache under
+    cache_key when a cache is given.
+    """
+    if cache is not None:
+        cached = cache.load('slice_graph', cache_key)
+        if cached is not None:
+            print(f'slice graph is loaded from cache: {cache_key}')
+            return graph_from_indices(G, cached['nodes'], cached['edges'])
 
     print(f'generating subgraphs...')
     G_modularity = G
     print(
         f"Before slicing: n of cc:{len(list(connected_components(G_modularity)))}, n of nodes: {len(G_modularity.nodes)}, n of edges, {len(G_modularity.edges)}")
-    p = multiprocessing.Pool(constants.N_OF_THREADS)
-
-    args = [(G_modularity, m) for m in modules]
-    G_modules = p.starmap(create_subgraph, args)
-    # G_modules = p.map(create_subgraph, G_modularity, [m for m in modules])
-    p.close()
-    # print(f'{modules}')
-    print(f'# of modules after extraction: {len(G_modules)}')
-    G_modularity = nx.algorithms.operators.union_all(G_modules)
+    node_indices, edge_indices = slice_graph_indices(G_modularity, modules)
+    G_modularity = graph_from_indices(G_modularity, node_indices, edge_indices)
+    print(f'# of modules after extraction: {len(modules)}')
     print(
         f"After slicing: n of cc:{len(list(connected_components(G_modularity)))}, n of nodes: {len(G_modularity.nodes)}, n of edges, {len(G_modularity.edges)}")
-    pickle.dump(G_modularity, open(cache_file, 'wb+'))
-    print('subgraphs\' pkl is saved')
+    if cache is not None:
+        cache.save('slice_graph', cache_key, nodes=node_indices, edges=edge_indices)
+        print(f'slice graph is saved to cache: {cache_key}')
+    return G_modularity
 
 
 def prune_network_by_modularity_old(G, modules, dummy):
@@ -102,36 +250,49 @@ def prune_network_by_modularity_old(G, modules, dummy):
     return G_modularity
 
 
+def slice_adjacency(edges_grid, n_nodes):
+    """
+    Symmetric CSR adjacency of a slice from its (n_edges, 2) edge index
+    array; a self-loop is stored once.
+    """
+    u, v = edges_grid[:, 0], edges_grid[:, 1]
+    not_loop = u != v
+    rows = np.concatenate([u, v[not_loop]])
+    cols = np.concatenate([v, u[not_loop]])
+    return scipy.sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_nodes, n_nodes))
+
+
+def _diffusion_prizes(adjacency, is_pertubed, prize_factor, n_steps):
+    layer = linear_threshold_sparse(adjacency, is_pertubed, steps=n_steps)
+    return [prize_factor ** i_layer if i_layer >= 0 else 0 for i_layer in layer.tolist()]
+
+
 def get_pcst_prize(G_cc, prize_factor, n_steps):
-    prizes = {}
-    p_cc = linear_threshold(G_cc, [n for n in G_cc.nodes if G_cc.nodes[n]['pertubed_node'] > 0], steps=n_steps)
-    for p_node in G_cc.nodes:
-        prizes[p_node] = 0
-    for i_cur_layer, cur_layer in enumerate(p_cc):
-        for cur_node in cur_layer:
-            prizes[cur_node] += prize_factor ** i_cur_layer
+    """
+    Prize of every node of the slice: prize_factor ** i for nodes that the
+    linear threshold diffusion from the active nodes reaches in step i,
+    0 for nodes it never reaches.
+    """
+    nodes = list(G_cc.nodes)
+    adjacency = nx.to_scipy_sparse_array(G_cc, nodelist=nodes, weight=None, format='csr')
+    is_pertubed = np.array([G_cc.nodes[n]['pertubed_node'] > 0 for n in nodes], dtype=bool)
+
+    return dict(zip(nodes, _diffusion_prizes(adjacency, is_pertubed, prize_factor, n_steps)))
 
-    return prizes
 
 def run_pcst(G_cc, i_cc, labels, n_steps, nodes, prize_factor):
+    node_index = {n: i for i, n in enumerate(nodes)}
+    edges_grid = np.fromiter((node_index[n] for cur_edge in G_cc.edges for n in cur_edge), dtype=np.int64,
+                             count=2 * G_cc.number_of_edges()).reshape(-1, 2)
+    is_pertubed = np.array([bool(labels[n]["pertubed_node"]) for n in nodes], dtype=bool)
+
     ## set prize ##
-    prizes = get_pcst_prize(G_cc, prize_factor, n_steps)
-    vertices_prizes = []
-    for cur_node in nodes:
-        vertices_prizes.append(
-            G_cc.nodes[cur_node]["pertubed_node"] if G_cc.nodes[cur_node]["pertubed_node"] else prizes[cur_node])
+    prizes = _diffusion_prizes(slice_adjacency(edges_grid, len(nodes)), is_pertubed, prize_factor, n_steps)
+    vertices_prizes = np.where(is_pertubed, 1.0, np.array(prizes, dtype=np.float64))
 
     ## set cost ##
-    edges_grid = []
-    for cur_edge in G_cc.edges:
-        edges_grid.append([nodes.index(cur_edge[0]), nodes.index(cur_edge[1])])
-
-    edges_costs = []
-    for cur_edge in edges_grid:
-        u_score = 0 if G_cc.nodes[nodes[cur_edge[0]]]["pertubed_node"] else 0.9999
-        v_score = 0 if G_cc.nodes[nodes[cur_edge[1]]]["pertubed_node"] else 0.9999
-
-        edges_costs.append(np.min([u_score, v_score]))
+    # 0 if any endpoint is active, 0.9999 otherwise
+    edges_costs = np.where(is_pertubed[edges_grid].any(axis=1), 0.0, 0.9999)
 
     ## find pcst component by running pcst fast##
     root = -1
@@ -144,7 +305,77 @@ def run_pcst(G_cc, i_cc, labels, n_steps, nodes, prize_factor):
     return edges, edges_grid
 
 
-def split_subslice_into_putative_modules(G_optimized, improvement_delta, modularity_score_objective, best_modularity):
+def _component_edge_betweenness(G, nodes):
+    """
+    Edge betweenness of the connected component `nodes` of G as networkx
+    accumulates it before rescaling (over ordered pairs of nodes), keyed by
+    both orientations of every edge. On a tree, which is what the pcst
+    solutions are, every edge is a bridge and its betweenness is 2*a*b, a
+    and b being the number of nodes on either side of it.
+    """
+    n_edges = sum(len(G.adj[n]) for n in nodes) // 2
+    if n_edges != len(nodes) - 1:
+        betweenness = {e: 2 * b for e, b in
+                       nx.edge_betweenness_centrality(G.subgraph(nodes), normalized=False).items()}
+    else:
+        root = next(iter(nodes))
+        parent = {root: None}
+        order = [root]
+        for u in order:
+            for v in G.adj[u]:
+                if v not in parent:
+                    parent[v] = u
+                    order.append(v)
+        size = dict.fromkeys(order, 1)
+        betweenness = {}
+        for v in reversed(order[1:]):
+            size[parent[v]] += size[v]
+            betweenness[(parent[v], v)] = 2.0 * size[v] * (len(nodes) - size[v])
+
+    betweenness.update({(v, u): b for (u, v), b in betweenness.items()})
+    return betweenness
+
+
+def girvan_newman_split(G, betweenness_cache=None):
+    """
+    Same components as next(girvan_newman(G)): the edge of highest
+    betweenness is removed until the number of connected components grows.
+    Betweenness does not cross components, so after a removal only the
+    component that lost the edge is rescored, and components found in
+    betweenness_cache (keyed by their nodes and degree sum) are not scored
+    at all; repeated splits of the same graph only score the components
+    that the previous split created.
+    """
+    g = G.copy()
+    g.remove_edges_from(list(nx.selfloop_edges(g)))
+    components = list(connected_components(g))
+    if g.number_of_edges() == 0:
+        return tuple(components)
+
+    # girvan_newman compares normalized betweenness, scale the same way to get the same ties
+    scale = 1 / (len(g) * (len(g) - 1))
+    scores = {}
+    for nodes in components:
+        key = (frozenset(nodes), sum(len(g.adj[n]) for n in nodes))
+        if betweenness_cache is not None and key in betweenness_cache:
+            scores.update(betweenness_cache[key])
+            continue
+        betweenness = _component_edge_betweenness(g, nodes)
+        if betweenness_cache is not None:
+            betweenness_cache[key] = betweenness
+        scores.update(betweenness)
+
+    while True:
+        u, v = max(g.edges(), key=lambda e: scores[e] * scale)
+        g.remove_edge(u, v)
+        component = nx.node_connected_component(g, u)
+        if v not in component:
+            return tuple(connected_components(g))
+        scores.update(_component_edge_betweenness(g, component))
+
+
+def split_subslice_into_putative_modules(G_optimized, improvement_delta, modularity_score_objective, best_modularity,
+                                         betweenness_cache=None):
     cur_components = [G_optimized.subgraph(c) for c in connected_components(G_optimized)]
     cur_modularity = modularity(G_optimized, cur_components, weight='weight')
     if cur_modularity >= modularity_score_objective:
@@ -157,8 +388,7 @@ def split_subslice_into_putative_modules(G_optimized, improvement_delta, modular
     if len(cur_components) == 0:
         return True, best_modularity
 
-    optimized_connected_components = girvan_newman(G_optimized)
-    cur_components = sorted(next(optimized_connected_components))
+    cur_components = sorted(girvan_newman_split(G_optimized, betweenness_cache))
     cur_modularity = modularity(G_optimized, cur_components, weight='weight')
     if cur_modularity <= best_modularity + improvement_delta:
         return True, best_modularity
@@ -166,14 +396,9 @@ def split_subslice_into_putative_modules(G_optimized, improvement_delta, modular
     else:
         optimal_components = cur_components
 
-        edges_to_remove = []
-        for cur_edge in G_optimized.edges:
-            included = False
-            for n_nodes in optimal_components:
-                if cur_edge[0] in n_nodes and cur_edge[1] in n_nodes:
-                    included = True
-            if not included:
-                edges_to_remove.append(cur_edge)
+        component_of = {n: i for i, n_nodes in enumerate(optimal_components) for n in n_nodes}
+        edges_to_remove = [cur_edge for cur_edge in G_optimized.edges
+                           if component_of.get(cur_edge[0], -1) != component_of.get(cur_edge[1], -2)]
 
         G_optimized.remove_edges_from(edges_to_remove)
 
@@ -181,11 +406,13 @@ def split_subslice_into_putative_modules(G_optimized, improvement_delta, modular
 
 
 def get_putative_modules(G, full_G=None, improvement_delta=0, modularity_score_objective=1, module_threshold=0.05,
-                         n_cc=1.0):
+                         n_cc=1.0, stats=None):
     """"""
 
     if full_G == None:
         full_G = G
+    if stats is None:
+        stats = perturbation_stats(full_G)
     G_optimized = G.copy()
 
     # clean subslice from cycles and isolated nodes
@@ -193,13 +420,10 @@ def get_putative_modules(G, full_G=None, improvement_delta=0, modularity_score_o
     G_optimized.remove_nodes_from(list(nx.isolates(G_optimized)))
 
     # check subslice enrichment for active nodes
-    pertubed_nodes = [cur_node for cur_node in full_G.nodes if full_G.nodes[cur_node]["pertubed_node"]]
-    pertubed_nodes_in_cc = [n for n in G_optimized.nodes if G_optimized.nodes[n]["pertubed_node"]]
-    n_nodes = list(G_optimized.nodes)
-    sig_score = hypergeom.sf(len(pertubed_nodes_in_cc), len(full_G.nodes), len(pertubed_nodes),
-                             len(n_nodes)) \
-                + hypergeom.pmf(len(pertubed_nodes_in_cc), len(full_G.nodes), len(pertubed_nodes),
-                                len(n_nodes))
+    n_pertubed_nodes_in_cc = stats.count_pertubed(G_optimized.nodes)
+    n_nodes = len(G_optimized)
+    sig_score = hypergeom.sf(n_pertubed_nodes_in_cc, stats.n_nodes, stats.n_pertubed, n_nodes) \
+                + hypergeom.pmf(n_pertubed_nodes_in_cc, stats.n_nodes, stats.n_pertubed, n_nodes)
 
     sig_score = sig_score / n_cc
 
@@ -210,9 +434,11 @@ def get_putative_modules(G, full_G=None, improvement_delta=0, modularity_score_o
 
     break_loop = is_enriched_sublice
     best_modularity = -1
+    betweenness_cache = {}
     while not break_loop:
         break_loop, best_modularity = split_subslice_into_putative_modules(G_optimized, improvement_delta,
-                                                                           modularity_score_objective, best_modularity)
+                                                                           modularity_score_objective, best_modularity,
+                                                                           betweenness_cache)
 
     G_optimized.remove_nodes_from(list(nx.isolates(G_optimized)))
 
@@ -222,138 +448,294 @@ def get_putative_modules(G, full_G=None, improvement_delta=0, modularity_score_o
     return G_optimized, cc_optimized
 
 
-def retain_relevant_slices(G_modularity, G_original, module_sig_th):
-    pertubed_nodes = []
-    for cur_node in G_modularity.nodes():
-        if G_modularity.nodes[cur_node]["pertubed_node"]:
-            pertubed_nodes.append(cur_node)
+def retain_relevant_slices(G_modularity, G_original, module_sig_th, stats=None):
+    """
+    Keeps the slices (connected components of G_modularity) that are large
+    and perturbed enough and whose hypergeometric enrichment for active
+    nodes passes the FDR threshold module_sig_th. Slice sizes and active
+    counts come from a bincount over the slice label of every node.
+    """
+    ccs = list(connected_components(G_modularity))
+    print(f"number of slices: {len(ccs)}")
+    cc_of_node = {n: i_cur_cc for i_cur_cc, cur_cc in enumerate(ccs) for n in cur_cc}
+    cc_labels = np.fromiter((cc_of_node[n] for n in G_modularity), dtype=np.int64, count=len(G_modularity))
+    if stats is None:
+        stats = perturbation_stats(G_original)
+    is_pertubed = stats.mask(G_modularity.nodes)
 
-    ccs = [G_modularity.subgraph(c) for c in connected_components(G_modularity)]
-    params = []
-    p = multiprocessing.Pool(constants.N_OF_THREADS)
     n_G_original = len(G_original)
-    n_pertubed_nodes = len(pertubed_nodes)
-    pertubed_nodes_in_ccs = []
-    print(f"number of slices: {len(list(ccs))}")
-    for i_cur_cc, cur_cc in enumerate(ccs):
-        pertubed_nodes_in_ccs.append(
-            len([cur_node for cur_node in cur_cc if G_modularity.nodes[cur_node]["pertubed_node"]])) 
+    n_pertubed_nodes = int(is_pertubed.sum())
+    cc_sizes = np.bincount(cc_labels, minlength=len(ccs))
+    pertubed_nodes_in_ccs = np.bincount(cc_labels[is_pertubed], minlength=len(ccs))
     perturbation_factor = min(0.7, (float(n_pertubed_nodes) / n_G_original) * (
                 1 + 100 / n_G_original ** 0.5))
 
-    for i_cur_cc, cur_cc in enumerate(ccs):
-        params.append([G_modularity, n_G_original, cur_cc, i_cur_cc, n_pertubed_nodes, perturbation_factor])
-
-    res = [a for a in p.map(pf_filter, params) if a is not None]
-    print(f'# of slices after perturbation TH: {len(res)}/{len(params)}')
-    p.close()
-    if len(res) == 0:
+    if n_pertubed_nodes == 0:
+        candidates = np.empty(0, dtype=np.int64)
+    else:
+        candidates = np.flatnonzero((cc_sizes >= 4) & (
+                (pertubed_nodes_in_ccs / cc_sizes.clip(min=1) >= perturbation_factor) |
+                (pertubed_nodes_in_ccs / float(n_pertubed_nodes) >= 0.1)))
+    print(f'# of slices after perturbation TH: {len(candidates)}/{len(ccs)}')
+    if len(candidates) == 0:
         return nx.Graph(), [], []
-    large_modules, sig_scores = zip(*res)
+
+    k, N = pertubed_nodes_in_ccs[candidates], cc_sizes[candidates]
+    sig_scores = hypergeom.sf(k, n_G_original, n_pertubed_nodes, N) + \
+                 hypergeom.pmf(k, n_G_original, n_pertubed_nodes, N)
     fdr_bh_results = fdrcorrection0(sig_scores, alpha=module_sig_th, method='indep',
                                     is_sorted=False)
 
-    # print(fdr_bh_results)
-    # print(f'min: {min(list(fdr_bh_results[1]))}')
-    passed_modules = [cur_cc for cur_cc, is_passed_th in zip(large_modules, fdr_bh_results[0]) if is_passed_th]
-    return nx.algorithms.operators.union_all(passed_modules) if len(passed_modules) > 0 else nx.Graph(), [list(m.nodes)
-                                                                                                          for m in
-                                                                                                          passed_modules], \
+    passed_modules = [G_modularity.subgraph(ccs[i_cur_cc]) for i_cur_cc in candidates[fdr_bh_results[0]]]
+    passed_nodes = [n for m in passed_modules for n in m.nodes]
+    return G_modularity.subgraph(passed_nodes).copy(), [list(m.nodes) for m in passed_modules], \
            fdr_bh_results[1]
 
 
-def pf_filter(params):
-    G_modularity, n_G_original, cur_cc, i_cur_cc, n_pertubed_nodes, perturbation_factor = params
-    pertubed_nodes_in_cc = [cur_node for cur_node in cur_cc if G_modularity.nodes[cur_node]["pertubed_node"]]
-    if len(cur_cc) < 4 or n_pertubed_nodes == 0 or not (
-            len(pertubed_nodes_in_cc) / float(len(cur_cc)) >= perturbation_factor or len(pertubed_nodes_in_cc) / float(
-            n_pertubed_nodes) >= 0.1):
-        return None
-    else:
-        score = hypergeom.sf(len(pertubed_nodes_in_cc), n_G_original, n_pertubed_nodes,
-                             len(cur_cc)) \
-                + hypergeom.pmf(len(pertubed_nodes_in_cc), n_G_original, n_pertubed_nodes,
-                                len(cur_cc))
-        return (cur_cc, score)
-
-
-def analyze_slice(params):
-    G, cc, i_cc, n_steps, relevant_slices, prize_factor, module_threshold = params
+def analyze_slice(G, all_nodes, task):
+    """
+    Runs pcst on a relevant slice of the network G (whose node list is
+    all_nodes) and splits the solution into putative modules. task holds
+    the node indices of the slice, the
+    attributes of its nodes, its PerturbationStats (see
+    PerturbationStats.restrict()) and the run parameters.
+    """
+    cc_index, cc_attrs, stats, i_cc, n_slices, n_steps, prize_factor, module_threshold = task
+    cc = [all_nodes[i] for i in cc_index]
     G_cc = nx.subgraph(G, cc)
     nodes = list(G_cc.nodes)
-    labels = {n: G_cc.nodes[n] for n in nodes}
-    n_pertubed_nodes = sum([G.nodes[a]["pertubed_node"] for a in G.nodes])
-    prize_factor = max(0, 1 - 3 * n_pertubed_nodes / float(len(G.nodes)))
+    node_attrs = dict(zip(cc, cc_attrs))
+    labels = {n: node_attrs[n] for n in nodes}
+    prize_factor = max(0, 1 - 3 * stats.n_pertubed / float(stats.n_nodes))
     # print(f'active gene ratio: {n_pertubed_nodes}/{len(G_cc.nodes)}')
     # print(f"prize factor: {prize_factor}")
     edges, edges_grid = run_pcst(G_cc, i_cc, labels, n_steps, nodes, prize_factor)
     G_subslice = nx.Graph()
     G_subslice.add_edges_from([(nodes[edges_grid[e][0]], nodes[edges_grid[e][1]]) for e in edges])
     nx.set_node_attributes(G_subslice, {n: labels[n] for n in G_subslice.nodes})
-    modularity_score_objective = np.log(len(G_subslice.nodes)) / np.log(len(G.nodes)) if len(
+    modularity_score_objective = np.log(len(G_subslice.nodes)) / np.log(stats.n_nodes) if len(
         G_subslice.nodes) > 10 else -1
     subslice_after_ng, putative_modules_of_slice = get_putative_modules(G_subslice, G, improvement_delta=10 ** -2,
                                                                         modularity_score_objective=modularity_score_objective,
-                                                                        n_cc=len(relevant_slices),
-                                                                        module_threshold=module_threshold)
+                                                                        n_cc=n_slices,
+                                                                        module_threshold=module_threshold,
+                                                                        stats=stats)
 
     return putative_modules_of_slice
 
 
-def get_final_modules(G, G_putative_modules, module_threshold):
-    module_sigs = []
-    for i_cur_module, cur_G_module in enumerate(G_putative_modules):
-        pertubed_nodes_in_cc = [cur_node for cur_node in cur_G_module.nodes if G.nodes[cur_node]["pertubed_node"]]
-        pertubed_nodes = [cur_node for cur_node in G.nodes if G.nodes[cur_node]["pertubed_node"]]
-
-        sig_score = hypergeom.sf(len(pertubed_nodes_in_cc), len(G.nodes), len(pertubed_nodes),
-                                 len(cur_G_module.nodes)) \
-                    + hypergeom.pmf(len(pertubed_nodes_in_cc), len(G.nodes), len(pertubed_nodes),
-                                    len(cur_G_module.nodes))
+def get_final_modules(G, G_putative_modules, module_threshold, stats=None):
+    if stats is None:
+        stats = perturbation_stats(G)
+    k = np.array([stats.count_pertubed(m.nodes) for m in G_putative_modules], dtype=np.int64)
+    N = np.array([len(m) for m in G_putative_modules], dtype=np.int64)
+    sig_scores = hypergeom.sf(k, stats.n_nodes, stats.n_pertubed, N) + \
+                 hypergeom.pmf(k, stats.n_nodes, stats.n_pertubed, N)
 
-        final_module_threshold = module_threshold / len(G_putative_modules)
-        if sig_score <= final_module_threshold:
-            module_sigs.append((cur_G_module, sig_score / len(G_putative_modules)))
+    final_module_threshold = module_threshold / max(len(G_putative_modules), 1)
+    module_sigs = [(cur_G_module, sig_score / len(G_putative_modules))
+                   for cur_G_module, sig_score in zip(G_putative_modules, sig_scores.tolist())
+                   if sig_score <= final_module_threshold]
 
     module_sigs = sorted(module_sigs, key=lambda a: a[1])
     return [a[0] for a in module_sigs]
 
 
+def input_cache():
+    """
+    ArrayCache of the network and slice graph in constants.CACHE_DIR, or
+    None if constants.USE_CACHE is off.
+    """
+    if not constants.USE_CACHE:
+        return None
+    return ArrayCache(constants.CACHE_DIR, constants.CACHE_MAX_BYTES)
+
+
+def load_network(network_file, cache=None, network_key=None):
+    """
+    Builds the network of network_file, or reads it from the cache, where
+    it is keyed by the content hash of the file (network_key, computed if
+    not given).
+    """
+    if cache is not None:
+        network_key = file_digest(network_file) if network_key is None else network_key
+        cached = cache.load('network', network_key)
+        if cached is not None:
+            print(f'network is loaded from cache: {network_key}')
+            G = network_from_edges(cached['nodes'].tolist(), cached['edges'])
+            print("done building network")
+            return G
+
+    print(f'generating graph from {network_file}')
+    nodes, edges = read_network_edges(network_file)
+    G = network_from_edges(nodes, edges)
+    if cache is not None:
+        cache.save('network', network_key, nodes=np.array(nodes, dtype=str), edges=edges)
+        print(f'network is saved to cache: {network_key}')
+
+    print("done building network")
+    return G
+
+
+def _load_inputs(network_file, slices_file):
+    """
+    Network, slices, cache and slice graph cache key of a file-based run.
+    """
+    cache = input_cache()
+    network_key = slice_graph_key = None
+    if cache is not None:
+        network_key = file_digest(network_file)
+        slice_graph_key = combined_digest(network_key, file_digest(slices_file))
+    G = load_network(network_file, cache, network_key)
+    return G, read_preprocessed_slices(slices_file), cache, slice_graph_key
+
+
 def main(active_genes_file, network_file, slices_file=None, slice_threshold=0.3, module_threshold=0.05, prize_factor=0,
          n_steps=20):
     print("start running DOMINO...")
-    if os.path.exists(f'{network_file}.pkl') and constants.USE_CACHE:
-        G = pickle.load(open(f'{network_file}.pkl', 'rb'))
-        print(f'network\' pkl is loaded: {network_file}.pkl')
-    else:
-        print(f'generating graph from {network_file}')
-        G = build_network(network_file)
-        pickle.dump(G, open(f'{network_file}.pkl', 'wb+'))
-        print(f'network\' pkl is saved: {network_file}.pkl')
-
-    print("done building network")
+    G, modularity_connected_components, cache, slice_graph_key = _load_inputs(network_file, slices_file)
     # assign activeness to nodes
     scores = extract_scores(active_genes_file)
     G = add_scores_to_nodes(G, scores)
 
-    modularity_connected_components = read_preprocessed_slices(slices_file)
+    return find_modules(G, modularity_connected_components, slice_threshold=slice_threshold,
+                        module_threshold=module_threshold, prize_factor=prize_factor, n_steps=n_steps,
+                        cache=cache, slice_graph_key=slice_graph_key)
+
+
+def main_batch(active_genes_files, network_file, slices_file=None, slice_threshold=0.3, module_threshold=0.05,
+               prize_factor=0, n_steps=20):
+    """
+    main() for several active gene files on the same network: the network,
+    its slices and the slice graph are loaded once, see find_modules_batch().
+
+    Returns a dict active gene file -> final modules
+    """
+    print("start running DOMINO...")
+    G, modularity_connected_components, cache, slice_graph_key = _load_inputs(network_file, slices_file)
+
+    return find_modules_batch(G, modularity_connected_components,
+                              {f: extract_scores(f) for f in active_genes_files},
+                              slice_threshold=slice_threshold, module_threshold=module_threshold,
+                              prize_factor=prize_factor, n_steps=n_steps, cache=cache,
+                              slice_graph_key=slice_graph_key)
+
+
+def run_domino(G, active_genes, slices=None, slice_threshold=0.3, module_threshold=0.05, prize_factor=0,
+               n_steps=20, processes=None, slices_cache_dir=None, slicing_backend='python-louvain', pool=None):
+    """
+    Runs DOMINO on an in-memory network, without reading or writing any file.
+
+    G: networkx graph, only its edges are used (G itself is not modified)
+    active_genes: iterable of active genes, or a mapping gene -> score
+    slices: list of node lists as returned by compute_slices(); computed
+            from G when not given
+    slices_cache_dir: directory where computed slices are cached per network
+    slicing_backend: Louvain implementation used to compute the slices, see
+                     preprocess_slices.SLICING_BACKENDS
+    processes: number of worker processes, constants.N_OF_THREADS by default
+    pool: DominoPool on domino_network(G), to keep the workers across runs
+          on the same network (processes is then ignored); the scores of
+          the run are set on its network
+
+    Returns the final modules as a list of networkx graphs.
+    """
+    print("start running DOMINO...")
+    if pool is None:
+        G = domino_network(G)
+    else:
+        if G is not pool.network and network_fingerprint(domino_network(G)) != pool.fingerprint:
+            raise ValueError("the pool was not created for this network")
+        G = pool.network
+    nx.set_node_attributes(G, 0, 'score')
+    G = add_scores_to_nodes(G, active_genes_to_scores(active_genes))
+    if slices is None:
+        slices = compute_slices(G, cache_dir=slices_cache_dir, backend=slicing_backend)
+
+    return find_modules(G, slices, slice_threshold=slice_threshold, module_threshold=module_threshold,
+                        prize_factor=prize_factor, n_steps=n_steps, processes=processes, pool=pool)
+
+
+def find_modules(G, slices, slice_threshold=0.3, module_threshold=0.05, prize_factor=0, n_steps=20,
+                 cache=None, slice_graph_key=None, processes=None, pool=None):
+    """
+    Core of DOMINO on a network whose nodes carry their activeness (see
+    add_scores_to_nodes()): retains the relevant slices, runs PCST on each
+    of them and returns the significant putative modules.
+
+    The slices are analyzed by pool, a DominoPool on G (or on a graph with
+    the same nodes and edges in the same order); without one, a pool of
+    `processes` workers is created for this call. With a cache (see
+    input_cache()) the slice graph is cached under slice_graph_key.
+    """
+    if pool is None:
+        with DominoPool(G, processes) as pool:
+            return find_modules(G, slices, slice_threshold=slice_threshold, module_threshold=module_threshold,
+                                prize_factor=prize_factor, n_steps=n_steps, cache=cache,
+                                slice_graph_key=slice_graph_key, pool=pool)
+
+    G_modularity = prune_network_by_modularity(G, slices, cache, slice_graph_key)
+    stats, tasks = slice_tasks(G, G_modularity, slice_threshold, module_threshold, prize_factor, n_steps, pool)
+    return report_final_modules(G, pool.map(analyze_slice, tasks), module_threshold, stats)
+
+
+def find_modules_batch(G, slices, scores_by_disease, slice_threshold=0.3, module_threshold=0.05, prize_factor=0,
+                       n_steps=20, cache=None, slice_graph_key=None, processes=None, pool=None):
+    """
+    find_modules() for several diseases on the same network. The slice
+    graph does not depend on the activeness of the nodes, so it is built
+    once; each disease then only scores the nodes (scores_by_disease maps a
+    disease to a scores table as returned by extract_scores()) and retains
+    its relevant slices, and the slices of all diseases are analyzed
+    together by the pool.
+
+    The nodes of G carry the scores of the last disease afterwards.
+
+    Returns a dict disease -> final modules
+    """
+    if pool is None:
+        with DominoPool(G, processes) as pool:
+            return find_modules_batch(G, slices, scores_by_disease, slice_threshold=slice_threshold,
+                                      module_threshold=module_threshold, prize_factor=prize_factor, n_steps=n_steps,
+                                      cache=cache, slice_graph_key=slice_graph_key, pool=pool)
+
+    G_modularity = prune_network_by_modularity(G, slices, cache, slice_graph_key)
+    disease_tasks = {}
+    for disease, scores in scores_by_disease.items():
+        print(f'retaining relevant slices of {disease}')
+        disease_tasks[disease] = slice_tasks(add_scores_to_nodes(G, scores), G_modularity, slice_threshold,
+                                             module_threshold, prize_factor, n_steps, pool)
+
+    results = iter(pool.map(analyze_slice, [task for _, tasks in disease_tasks.values() for task in tasks]))
+    final_modules = {}
+    for disease, (stats, tasks) in disease_tasks.items():
+        print(f'final modules of {disease}')
+        final_modules[disease] = report_final_modules(G, [next(results) for _ in tasks], module_threshold, stats)
+    return final_modules
 
-    global G_modularity
-    prune_network_by_modularity(G, modularity_connected_components, os.path.join(os.path.split(slices_file)[0],
-                                                                                 os.path.split(network_file)[1].split(
-                                                                                     ".")[0] + "." +
-                                                                                 os.path.split(slices_file)[1].split(
-                                                                                     ".")[0] + ".pkl"))
-    G_modularity, relevant_slices, qvals = retain_relevant_slices(G_modularity, G, slice_threshold)
+
+def slice_tasks(G, G_modularity, slice_threshold, module_threshold, prize_factor, n_steps, pool):
+    """
+    Per-disease part of find_modules() before pcst: retains the slices of
+    G_modularity that are relevant for the activeness of the nodes of G and
+    returns the PerturbationStats of G and the analyze_slice() task of
+    every relevant slice. Tasks hold copies of the node attributes, so G
+    can be scored for another disease before they run.
+    """
+    stats = perturbation_stats(G)
+    _, relevant_slices, qvals = retain_relevant_slices(G_modularity, G, slice_threshold, stats)
     print(f'{len(relevant_slices)} relevant slices were retained with threshold {slice_threshold}')
-    params = []
+    tasks = []
     for i_cc, cc in enumerate(relevant_slices):
-        params.append([G, cc, i_cc, n_steps, relevant_slices, prize_factor, module_threshold])
-    p = multiprocessing.Pool(constants.N_OF_THREADS)
-    putative_modules = reduce(lambda a, b: a + b, p.map(analyze_slice, params), [])
-    p.close()
+        tasks.append((pool.indices(cc), [dict(G.nodes[n]) for n in cc], stats.restrict(cc), i_cc,
+                      len(relevant_slices), n_steps, prize_factor, module_threshold))
+    return stats, tasks
+
+
+def report_final_modules(G, putative_modules_of_slices, module_threshold, stats):
+    putative_modules = reduce(lambda a, b: a + b, putative_modules_of_slices, [])
     print(f'n of putative modules: {len(putative_modules)}')
-    final_modules = get_final_modules(G, putative_modules, module_threshold)
+    final_modules = get_final_modules(G, putative_modules, module_threshold, stats)
     print(
         f'n of final modules: {len(final_modules)} (n={[len(list(m)) for m in final_modules]})')
     return final_modules
@@ -1,16 +1,38 @@
 import networkx as nx
+import numpy as np
 import pandas as pd
 
 
-def build_network(network_file):
-    """"""
-    edges_dataset = pd.read_csv(network_file, sep='\t', header=None, dtype=str)
-    edges = []
-    for ind, row in edges_dataset.iterrows():
-        # if row.iloc[0]!=row.iloc[2]:
-        edges.append((row.iloc[0], row.iloc[1]))
+def read_network_edges(network_file):
+    """
+    Reads the edges of a network file (tab separated, the first two columns
+    are the nodes of an edge).
+
+    Returns the node names in order of first appearance and the edges as an
+    (n_edges, 2) array of node indices, in file order. Rows with a missing
+    (empty) node are skipped.
+    """
+    edges_dataset = pd.read_csv(network_file, sep='\t', header=None, dtype=str, usecols=[0, 1])
+    # factorize() gives missing nodes the code -1, which would index the last node
+    edges_dataset = edges_dataset.dropna()
+    # factorizing the endpoints edge by edge numbers the nodes in order of first appearance
+    codes, nodes = pd.factorize(edges_dataset.to_numpy().ravel())
+    return nodes.tolist(), codes.astype(np.int64).reshape(-1, 2)
+
+
+def network_from_edges(nodes, edges):
+    """
+    Graph of the edges returned by read_network_edges(), built in file
+    order so that it is the same graph (including node and neighbor orders)
+    whether the edges were read from the file or from the cache.
+    """
     G = nx.Graph()
-    G.add_edges_from(edges)
+    G.add_edges_from((nodes[a], nodes[b]) for a, b in edges.tolist())
     nx.set_node_attributes(G, 0, 'score')
 
     return G
+
+
+def build_network(network_file):
+    """"""
+    return network_from_edges(*read_network_edges(network_file))
@@ -5,8 +5,145 @@ import pandas as pd
 import community as community_louvain
 import numpy as np
 import os 
+import hashlib
+import tempfile
+from src.core.community_detection import louvain_labels
 
-def create_slices(network_file, output_file_name, resolution=0.15):
+SLICING_BACKENDS = ('python-louvain', 'csr')
+SLICES_CACHE_VERSION = 1
+SLICES_FILE_VERSION = 1
+
+
+def louvain_partitions(G, resolutions, random_state=1, backend='python-louvain'):
+    """
+    Partitions G with the Louvain method at every resolution and returns a
+    dict resolution -> (dict community id -> list of nodes).
+
+    backend is one of SLICING_BACKENDS: 'python-louvain' (the reference
+    implementation) or 'csr', the compiled implementation of
+    src.core.community_detection, which converts G only once for all
+    resolutions.
+    """
+    if backend == 'csr':
+        labels = louvain_labels(G, resolutions, random_state=random_state)
+        return {resolution: partition_from_labels(G, labels[resolution]) for resolution in resolutions}
+    if backend != 'python-louvain':
+        raise ValueError(f'unknown slicing backend {backend!r}, choose one of {SLICING_BACKENDS}')
+
+    prts = {}
+    for resolution in resolutions:
+        partition = community_louvain.best_partition(G, resolution=resolution, random_state=random_state)  # 0.1
+        prt = {k: [] for k in np.arange(len(np.unique(list(partition.values()))))}
+        for k, v in partition.items():
+            prt[v].append(k)
+        prts[resolution] = prt
+    return prts
+
+
+def louvain_partition(G, resolution=0.15, random_state=1, backend='python-louvain'):
+    """
+    Partitions G with the Louvain method and returns the communities as
+    a dict community id -> list of nodes.
+    """
+    return louvain_partitions(G, [resolution], random_state=random_state, backend=backend)[resolution]
+
+
+def network_fingerprint(G):
+    """
+    Hash of the nodes and edges of G in their iteration order, which is
+    all the Louvain partition depends on (besides its parameters).
+    """
+    node_index = {n: i for i, n in enumerate(G.nodes)}
+    edges = np.fromiter((i for u, v in G.edges() for i in (node_index[u], node_index[v])),
+                        dtype=np.int64, count=2 * G.number_of_edges())
+    h = hashlib.sha1()
+    h.update("\t".join(map(str, G.nodes)).encode())
+    h.update(edges.tobytes())
+    return h.hexdigest()
+
+
+def partition_labels(G, prt):
+    """
+    Community id of every node of G (in node order) as an int32 array.
+    """
+    community_of = {n: k for k, v in prt.items() for n in v}
+    return np.array([community_of[n] for n in G.nodes], dtype=np.int32)
+
+
+def partition_from_labels(G, labels):
+    """
+    Inverse of partition_labels(): dict community id -> list of nodes.
+    """
+    prt = {k: [] for k in range(int(labels.max()) + 1 if len(labels) > 0 else 0)}
+    for n, k in zip(G.nodes, labels.tolist()):
+        prt[k].append(n)
+    return prt
+
+
+def cached_louvain_partitions(G, cache_dir, resolutions, random_state=1, backend='python-louvain'):
+    """
+    louvain_partitions() backed by a directory of .npz files, one per
+    (network fingerprint, backend, resolution, random_state), each holding
+    the community label of every node. A changed network has a different
+    fingerprint and is therefore partitioned again. Only the resolutions
+    that are not cached yet are computed.
+    """
+    if random_state is None:  # not reproducible, nothing to cache
+        return louvain_partitions(G, resolutions, random_state=random_state, backend=backend)
+
+    fingerprint = network_fingerprint(G)
+    cache_files = {resolution: os.path.join(cache_dir, f'slices_{fingerprint}_{backend}_r{resolution}_s{random_state}.npz')
+                   for resolution in resolutions}
+    prts = {}
+    for resolution, cache_file in cache_files.items():
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as cached:
+                if int(cached['version']) == SLICES_CACHE_VERSION and len(cached['labels']) == len(G):
+                    print(f'slices are loaded from cache: {cache_file}')
+                    prts[resolution] = partition_from_labels(G, cached['labels'])
+
+    missing = [resolution for resolution in resolutions if resolution not in prts]
+    computed = {}
+    if len(missing) > 0:
+        os.makedirs(cache_dir, exist_ok=True)
+        computed = louvain_partitions(G, missing, random_state=random_state, backend=backend)
+    for resolution, prt in computed.items():
+        fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix='.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, version=SLICES_CACHE_VERSION, labels=partition_labels(G, prt))
+        os.replace(tmp_file, cache_files[resolution])
+        print(f'slices are saved to cache: {cache_files[resolution]}')
+        prts[resolution] = prt
+    return prts
+
+
+def compute_multi_resolution_slices(G, resolutions, random_state=1, min_size=10, cache_dir=None,
+                                    backend='python-louvain'):
+    """
+    compute_slices() for several resolutions at once, returns a dict
+    resolution -> slices. With the 'csr' backend the network is converted
+    only once for all of them.
+    """
+    if cache_dir is None:
+        prts = louvain_partitions(G, resolutions, random_state=random_state, backend=backend)
+    else:
+        prts = cached_louvain_partitions(G, cache_dir, resolutions, random_state=random_state, backend=backend)
+    return {resolution: [v for v in prt.values() if len(v) >= min_size] for resolution, prt in prts.items()}
+
+
+def compute_slices(G, resolution=0.15, random_state=1, min_size=10, cache_dir=None, backend='python-louvain'):
+    """
+    Computes the slices of an in-memory network: its Louvain communities
+    with at least min_size nodes, as lists of nodes. This is what
+    create_slices() writes and read_preprocessed_slices() reads back.
+    With a cache_dir the partition is reused across calls, see
+    cached_louvain_partitions().
+    """
+    return compute_multi_resolution_slices(G, [resolution], random_state=random_state, min_size=min_size,
+                                           cache_dir=cache_dir, backend=backend)[resolution]
+
+
+def create_slices(network_file, output_file_name, resolution=0.15, backend='python-louvain'):
 
     if os.path.splitext(network_file)[1]==".sif":
         df = pd.read_csv(network_file, sep='\t')
@@ -17,10 +154,10 @@ def create_slices(network_file, output_file_name, resolution=0.15):
         G = nx.read_edgelist(network_file)
     
 
-    partition = community_louvain.best_partition(G, resolution=resolution, random_state=1)  # 0.1
-    prt = {k: [] for k in np.arange(len(np.unique(list(partition.values()))))}
-    for k, v in partition.items():
-        prt[v].append(k)
+    prt = louvain_partition(G, resolution=resolution, random_state=1, backend=backend)
+    if os.path.splitext(output_file_name)[1] == ".npz":
+        write_slices(output_file_name, [v for v in prt.values() if len(v) >= 10])
+        return
 
     i = 0
     with open(output_file_name, 'w+') as f:
@@ -31,7 +168,45 @@ def create_slices(network_file, output_file_name, resolution=0.15):
                 i += 1
 
 
+def write_slices(file_path, slices):
+    """
+    Binary slices file (.npz): the nodes of all slices, one slice after the
+    other, and the slice label of every node.
+    """
+    nodes = np.array([n for cur_slice in slices for n in cur_slice], dtype=str)
+    labels = np.repeat(np.arange(len(slices), dtype=np.int32), [len(cur_slice) for cur_slice in slices])
+    with open(file_path, 'wb') as f:
+        np.savez(f, version=SLICES_FILE_VERSION, nodes=nodes, labels=labels)
+
+
+def read_slices(file_path):
+    """
+    Reads a binary slices file written by write_slices().
+    """
+    with np.load(file_path, allow_pickle=False) as f:
+        if int(f['version']) != SLICES_FILE_VERSION:
+            raise ValueError(f'unsupported slices file version {int(f["version"])}: {file_path}')
+        nodes = f['nodes'].tolist()
+        labels = f['labels']
+    bounds = np.cumsum(np.bincount(labels)).tolist() if len(labels) > 0 else []
+    return [nodes[start:end] for start, end in zip([0] + bounds[:-1], bounds)]
+
+
+def convert_slices_file(text_file_path, file_path):
+    """
+    Converts a slices file of the legacy text format to the binary format.
+    """
+    write_slices(file_path, read_preprocessed_slices(text_file_path))
+
+
 def read_preprocessed_slices(file_path):
+    """
+    Reads a slices file, binary (.npz, see write_slices()) or of the legacy
+    text format.
+    """
+    if os.path.splitext(file_path)[1] == ".npz":
+        return read_slices(file_path)
+
     modules = []
 
     with open(file_path, 'r') as f:
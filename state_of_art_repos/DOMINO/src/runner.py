@@ -2,8 +2,8 @@ import argparse
 import os
 
 import src.constants as constants
-from src.core.domino import main as domino_main
-from src.core.preprocess_slices import create_slices
+from src.core.domino import main_batch as domino_main_batch
+from src.core.preprocess_slices import SLICING_BACKENDS, convert_slices_file, create_slices
 from src.utils.visualize_modules import visualize_modules
 
 
@@ -14,7 +14,8 @@ def main_domino():
     parser.add_argument('-n', '--network_file', dest='network_file', help='A path to network file (sif format). e.g. /path/to/network_file.sif', default="examples/huri.sif")
     parser.add_argument('-s', '--slices_file', dest='slices_file', help='A path to slices file (i.e. the output of "slicer" script). e.g., /path/to/slices_file.txt', default="examples/huri_slices.txt")
     parser.add_argument('-o', '--output_folder', dest='output_folder', help='A folder where output files will be written e.g., /path/to/output', default="examples/output")
-    parser.add_argument('-c', '--use_cache', dest='use_cache', help='Use auto-generated cache network files (*.pkl) from previous executions with the same network. NOTE: (1) THIS IS NOT THE SLICES FILE! (2) If the content of the file has changed, you should set this option to "false"', default="true")
+    parser.add_argument('-c', '--use_cache', dest='use_cache', help='Cache the network and the slice graph across executions in the cache folder. Entries are keyed by the content of the network and slices files, so a changed file is never served from the cache', default="true")
+    parser.add_argument('-cd', '--cache_dir', dest='cache_dir', help='The cache folder (at most 2GB, least recently used entries are removed first)', default=constants.CACHE_DIR)
     parser.add_argument('-p', '--parallelization', dest='parallelization', help='The number of threads allocated to the run (usually single thread is enough)', default="1")
     parser.add_argument('-v', '--visualization', dest='visualization', help='Indicates whether a visualization of the modules ought to be generated', default="true")
     parser.add_argument('-sth', '--slice_threshold', dest='slice_threshold', default="0.3", help='The threshold for considering a slice as relevant')
@@ -34,9 +35,12 @@ def main_domino():
 
     constants.N_OF_THREADS=parallelization
     constants.USE_CACHE=use_cache
+    constants.CACHE_DIR=args.cache_dir
 
+    # network, slices and slice graph are set up once for all active gene files
+    final_modules=domino_main_batch(active_genes_files=active_genes_files, network_file=network_file, slices_file=slices_file, slice_threshold=slice_threshold, module_threshold=module_threshold)
     for cur_ag in active_genes_files:
-        G_final_modules=domino_main(active_genes_file=cur_ag, network_file=network_file, slices_file=slices_file, slice_threshold=slice_threshold, module_threshold=module_threshold)
+        G_final_modules=final_modules[cur_ag]
         activity_name=os.path.splitext(os.path.split(cur_ag)[-1])[0]
         report_folder=os.path.join(output_folder,activity_name)
         try:
@@ -54,19 +58,30 @@ def main_domino():
         print(visualization)
         if visualization:
             visualize_modules(os.path.splitext(cur_ag.split('/')[-1])[0], G_final_modules, None, network_file, report_folder)
-        return G_final_modules
+    return final_modules
 
 def main_slicer():
 
     parser = argparse.ArgumentParser(description='Slicer for DOMINO (step #0): A preprocessing step for the network')
     parser.add_argument('-n', '--network_file', dest='network_file', help='A path to network file (sif format). e.g. /path/to/network_file.sif', default="examples/huri.sif")
-    parser.add_argument('-o', '--output_file', dest='output_file', default="examples/huri.sif", help='A path to the output slices file. e.g., /path/to/output/slices_file.txt')
+    parser.add_argument('-o', '--output_file', dest='output_file', default="examples/huri.sif", help='A path to the output slices file. e.g., /path/to/output/slices_file.txt, or /path/to/output/slices_file.npz for the binary format')
+    parser.add_argument('-b', '--backend', dest='backend', default="python-louvain", choices=SLICING_BACKENDS, help='Louvain implementation: "python-louvain" (reference) or "csr" (compiled, much faster on large networks)')
 
 
     args = parser.parse_args()
     network_file = args.network_file
     output_file = args.output_file
-    create_slices(network_file, output_file)
+    create_slices(network_file, output_file, backend=args.backend)
+
+
+def main_convert_slices():
+
+    parser = argparse.ArgumentParser(description='Converts a slices file of the text format to the binary format, which DOMINO reads much faster')
+    parser.add_argument('-i', '--input_file', dest='input_file', help='A path to a slices file of the text format. e.g., /path/to/slices_file.txt', required=True)
+    parser.add_argument('-o', '--output_file', dest='output_file', help='A path to the binary slices file. e.g., /path/to/slices_file.npz', required=True)
+
+    args = parser.parse_args()
+    convert_slices_file(args.input_file, args.output_file)
 
 
 
@@ -0,0 +1,113 @@
+"""
+Directory of .npz files keyed by content hashes, where DOMINO caches the
+network and the slice graph across runs.
+
+Files only hold plain arrays (no pickles) and the CACHE_VERSION they were
+written with; files of another version are ignored. Every file is written
+to a temporary file and renamed, so concurrent runs never read a partial
+file, and the least recently used files are evicted once the directory
+grows beyond max_bytes.
+"""
+
+import hashlib
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+CACHE_VERSION = 2
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    sha1 of the content of a file.
+    """
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def combined_digest(*parts):
+    """
+    sha1 of several digests (or other values), to key an entry that
+    depends on several inputs.
+    """
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(str(part).encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+class ArrayCache:
+    """
+    Entries are named by a kind ('network', 'slice_graph', ...) and a key,
+    and hold a dict of numpy arrays.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, kind, key):
+        return os.path.join(self.cache_dir, f'{kind}_{key}.npz')
+
+    def load(self, kind, key):
+        """
+        Returns the arrays of the entry, or None if there is no valid entry.
+        """
+        path = self._path(kind, key)
+        try:
+            with np.load(path, allow_pickle=False) as cached:
+                if int(cached['version']) != CACHE_VERSION:
+                    return None
+                arrays = {name: cached[name] for name in cached.files if name != 'version'}
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return arrays
+
+    def save(self, kind, key, **arrays):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp_', suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, version=CACHE_VERSION, **arrays)
+            os.replace(tmp_path, self._path(kind, key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the directory holds
+        at most max_bytes.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npz') or name.startswith('.tmp_'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:  # evicted by a concurrent run
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -13,8 +13,10 @@ import sys
 sys.setrecursionlimit(100000000)
 import copy
 import networkx as nx
+import numpy as np
+import scipy.sparse
 
-__all__ = ['linear_threshold']
+__all__ = ['linear_threshold', 'linear_threshold_sparse']
 
 def linear_threshold(G, seeds, steps=0):
   """Return the active nodes of each diffusion step by linear threshold model
@@ -130,4 +132,57 @@ def _influence_sum(G, froms, to):
   influence_sum = 0.0
   for f in froms:
     influence_sum += G[f][to]['influence']
-  return influence_sum
\ No newline at end of file
+  return influence_sum
+
+def linear_threshold_sparse(adjacency, seed_mask, steps=0, thresholds=0.5, influences=None):
+  """Linear threshold diffusion on a sparse adjacency matrix
+  Parameters
+  ----------
+  adjacency : scipy sparse matrix (n x n)
+      adjacency[u, v] != 0 if u influences v (symmetric for undirected
+      graphs, a self-loop counts once, as in G.to_directed())
+  seed_mask : boolean array (n)
+      The seed nodes
+  steps: int
+      The number of steps to diffuse
+      When steps <= 0, the model diffuses until no more nodes
+      can be activated
+  thresholds : float or array (n)
+      Node thresholds, 0.5 as in linear_threshold() by default
+  influences : scipy sparse matrix (n x n), optional
+      Edge influences with the sparsity of adjacency, 1/in_degree of the
+      target by default
+  Return
+  ------
+  layer : int array (n)
+    the diffusion step in which every node was activated: 0 for the
+    seeds, -1 for nodes that were never activated
+  Notes
+  -----
+  Same model as linear_threshold(): every round is one sparse
+  matrix-vector product of the transposed influences with the current
+  activation mask, and all nodes whose influence sum reaches their
+  threshold are activated together.
+  """
+  adjacency = scipy.sparse.csr_matrix(adjacency)
+  n = adjacency.shape[0]
+  if influences is None:
+    in_degree = adjacency.getnnz(axis=0)
+    influences = adjacency.astype(bool).astype(np.float64).tocsc()
+    influences.data = 1.0 / np.repeat(in_degree, np.diff(influences.indptr))
+  # rows of the transposed matrix are the predecessors of every node
+  influences_in = scipy.sparse.csr_matrix(influences.T)
+  reach_in = scipy.sparse.csr_matrix(adjacency.astype(bool).T, dtype=np.float64)
+
+  active = np.asarray(seed_mask, dtype=bool).copy()
+  layer = np.where(active, 0, -1)
+  i_step = 1
+  while (steps <= 0 or i_step <= steps) and active.sum() < n:
+    x = active.astype(np.float64)
+    activated = ~active & (reach_in @ x > 0) & (influences_in @ x >= thresholds)
+    if not activated.any():
+      break
+    layer[activated] = i_step
+    active |= activated
+    i_step += 1
+  return layer
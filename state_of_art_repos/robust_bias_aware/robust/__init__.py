@@ -1 +1 @@
-from .main import run
+from .main import run, Robust
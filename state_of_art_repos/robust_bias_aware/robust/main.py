@@ -1,46 +1,101 @@
+import multiprocessing
 import os.path
 import warnings
 
 import networkx as nx
 import pandas as pd
 
+from .pcst import PcstInstance
 from .ppi import *
-from .steinerdiv import ExpMinMaxDiverseSteinerTreeComputer
+from .steinerdiv import ExpMinMaxDiverseSteinerTreeComputer, SolutionSet, SteinerTree
 
 
 def run(seeds, network='BioGRID', namespace='GENE_SYMBOL', alpha=0.25, beta=0.9, n=30, tau=0.1, study_bias_scores=None, gamma=1.0, outfile=None):
-    is_graphml=0
-    # Check the namespace and parse the network.
-    namespace = _check_namespace(namespace)
-    network,is_graphml=_check_and_preprocess_network(network, namespace)
-    network = read_ppi_network(network, is_graphml)
-
-    # Parse the study bias scores if provided and set the edge weights.
-    if study_bias_scores is None:
-        edge_weights = UnitEdgeWeight()
-    # elif study_bias_scores=='None':
-    #     edge_weights = UnitEdgeWeight()
-    else:
-        path_to_study_bias_scores = _get_path_to_study_bias_scores(study_bias_scores, namespace)
-        if path_to_study_bias_scores=='None':
-            edge_weights = UnitEdgeWeight()
+    robust = Robust(network, namespace, study_bias_scores, gamma)
+    return robust.run(seeds, alpha, beta, n, tau, outfile)
+
+
+class Robust:
+    """
+    ROBUST on a network that is parsed, and whose edge weights and PCST
+    instance are set up, only once. Use it to compute the modules of many
+    seed sets (e.g., diseases) on the same network: only the terminals and
+    the vertex prizes change between runs.
+    """
+
+    def __init__(self, network='BioGRID', namespace='GENE_SYMBOL', study_bias_scores=None, gamma=1.0):
+        # Check the namespace and parse the network.
+        self.namespace = _check_namespace(namespace)
+        network, is_graphml = _check_and_preprocess_network(network, self.namespace)
+        self.network = read_ppi_network(network, is_graphml)
+        self.edge_weights = _get_edge_weights(self.network, study_bias_scores, self.namespace, gamma)
+        self._pcst_graph = None
+
+    def pcst_graph(self, ppi_instance):
+        """
+        The PcstInstance of the network, built (or taken from the cache of
+        PcstInstance) on the first run, with all prizes set to zero.
+        """
+        if self._pcst_graph is None:
+            self._pcst_graph = PcstInstance.for_instance(ppi_instance)
         else:
-            add_study_bias_scores_to_network(path_to_study_bias_scores, network)
-            gamma = _check_gamma(gamma)
-            edge_weights = BiasAwareEdgeWeight(network, gamma)
-    
-
-    # Kick out seeds not in network.
-    terminals = _get_terminals(seeds)
-    terminals = list(set(terminals).intersection(set(network.nodes)))
-
-
-    # Set up instance and engine.
-    ppi_instance = PPIInstance(network, terminals, edge_weights)
-    engine = ExpMinMaxDiverseSteinerTreeComputer(initial_fraction=alpha, reduction_factor=beta)
-
-    # Compute the module.
-    steiner_trees = engine(ppi_instance, n=n)
+            self._pcst_graph.reset_prizes()
+        return self._pcst_graph
+
+    def run(self, seeds, alpha=0.25, beta=0.9, n=30, tau=0.1, outfile=None):
+        ppi_instance = self._ppi_instance(seeds)
+        engine = ExpMinMaxDiverseSteinerTreeComputer(initial_fraction=alpha, reduction_factor=beta)
+
+        # Compute the module.
+        steiner_trees = engine(ppi_instance, n=n, pcst_graph=self.pcst_graph(ppi_instance))
+        module_as_df, module_as_subgraph = _get_module(steiner_trees, tau)
+
+        # Save module if requested.
+        if outfile is not None:
+            _save_module(module_as_df, module_as_subgraph, outfile)
+
+        # Return module.
+        return module_as_df, module_as_subgraph
+
+    def sweep(self, seeds, alphas=(0.25,), betas=(0.9,), ns=(30,), taus=(0.1,), processes=1):
+        """
+        Computes the modules of all combinations of alpha, beta, n and tau and returns
+        them as a dict (alpha, beta, n, tau) -> (module_as_df, module_as_subgraph), the
+        same as run() returns for these parameters.
+        The steiner trees are computed once per (alpha, beta) for the largest n: the
+        trees of a smaller n are the first n of them, and tau only filters the module.
+        With processes > 1, the (alpha, beta) are computed by that many worker processes,
+        which receive the PCST instance once.
+        """
+        ppi_instance = self._ppi_instance(seeds)
+        pcst_graph = self.pcst_graph(ppi_instance)
+        chains = [(alpha, beta, max(ns)) for alpha in alphas for beta in betas]
+        if processes == 1:
+            trees = [_compute_tree_chain(ppi_instance, pcst_graph, chain) for chain in chains]
+        else:
+            with multiprocessing.Pool(processes, initializer=_init_sweep_worker,
+                                      initargs=(ppi_instance, pcst_graph)) as pool:
+                trees = pool.map(_sweep_worker_chain, chains)
+
+        modules = {}
+        for (alpha, beta, _), chain_trees in zip(chains, trees):
+            steiner_trees = SolutionSet(ppi_instance)
+            for vertices, edges in chain_trees:
+                steiner_trees.append(SteinerTree(pcst_graph, vertices, edges))
+            for n in ns:
+                first_n = steiner_trees.first(n)
+                for tau in taus:
+                    modules[alpha, beta, n, tau] = _get_module(first_n, tau)
+        return modules
+
+    def _ppi_instance(self, seeds):
+        # Kick out seeds not in network.
+        terminals = _get_terminals(seeds)
+        terminals = list(set(terminals).intersection(set(self.network.nodes)))
+        return PPIInstance(self.network, terminals, self.edge_weights)
+
+
+def _get_module(steiner_trees, tau):
     module_as_df = steiner_trees.get_occurrences(include_terminals=True)
     # module_as_df.to_csv('module_as_df_original.txt', index=False) # --> Check original output nodes.
 
@@ -55,13 +110,45 @@ def run(seeds, network='BioGRID', namespace='GENE_SYMBOL', alpha=0.25, beta=0.9,
         for node in comp:
             module_as_subgraph.nodes[node]['connected_components_id'] = comp_idx
         comp_idx += 1
+    return module_as_df, module_as_subgraph
 
-    # Save module if requested.
-    if outfile is not None:
-        _save_module(module_as_df, module_as_subgraph, outfile)
 
-    # Return module.
-    return module_as_df, module_as_subgraph
+def _compute_tree_chain(ppi_instance, pcst_graph, chain):
+    """
+    The steiner trees of an (alpha, beta, n) as arrays of vertex ids and edge positions.
+    """
+    alpha, beta, n = chain
+    engine = ExpMinMaxDiverseSteinerTreeComputer(initial_fraction=alpha, reduction_factor=beta)
+    steiner_trees = engine(ppi_instance, n=n, pcst_graph=pcst_graph)
+    return [(tree.vertices, tree.edges) for tree in steiner_trees.trees]
+
+
+_worker_ppi_instance = None
+_worker_pcst_graph = None
+
+
+def _init_sweep_worker(ppi_instance, pcst_graph):
+    # every worker works on its own copy of the prizes
+    global _worker_ppi_instance, _worker_pcst_graph
+    _worker_ppi_instance = ppi_instance
+    _worker_pcst_graph = pcst_graph
+
+
+def _sweep_worker_chain(chain):
+    return _compute_tree_chain(_worker_ppi_instance, _worker_pcst_graph, chain)
+
+
+def _get_edge_weights(network, study_bias_scores, namespace, gamma):
+    # Parse the study bias scores if provided and set the edge weights.
+    if study_bias_scores is None:
+        return UnitEdgeWeight()
+    # elif study_bias_scores=='None':
+    #     edge_weights = UnitEdgeWeight()
+    path_to_study_bias_scores = _get_path_to_study_bias_scores(study_bias_scores, namespace)
+    if path_to_study_bias_scores=='None':
+        return UnitEdgeWeight()
+    gamma = _check_gamma(gamma)
+    return BiasAwareEdgeWeight.from_file(network, path_to_study_bias_scores, gamma)
 
 
 def _check_namespace(namespace):
@@ -1,2 +1,2 @@
-from .solve_pcst import solve_pcst
+from .solve_pcst import solve_pcst, solve_pcst_ids, pcst_solution_graph
 from .pcst_instance import PcstInstance
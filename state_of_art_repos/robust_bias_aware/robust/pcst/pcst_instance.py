@@ -1,10 +1,10 @@
-import networkx as nx
+from collections import OrderedDict
+
 import numpy as np
 import typing
 
-from .edge_ids import EdgeIds
 from .vertex_ids import VertexIds
-from ..ppi import PPIInstance
+from ..ppi import PPIInstance, network_arrays
 
 
 def unit_cost(e):
@@ -26,9 +26,16 @@ class PcstInstance:
     the PCST solver. It primarily saves the graph in a compatible and efficient
     data structure. You can use update functions to efficiently update a subpart
     of the weights.
-    Creating the instance for the PPI-graph is quite slow so you do not want to create
-    a new instance for every round but simply update the weights.
+    The instance is built from the numpy representation of the PPI-graph (see
+    NetworkArrays) and the costs are computed for all edges at once if the edge weights
+    support it. Use PcstInstance.for_instance to share one instance between all
+    instances with the same graph and edge weights, and only reset the prizes.
     """
+
+    # (network fingerprint, edge weights cache_key) -> PcstInstance
+    _cache = OrderedDict()
+    max_cached_instances = 4
+
     def __init__(self, ppi_instance: PPIInstance,
                  initial_costs_fn: typing.Optional[typing.Callable[[object], float]] = None,
                  initial_prize_fn: typing.Callable[[object], float] = zero_prize):
@@ -41,23 +48,47 @@ class PcstInstance:
         initial_prize_fn: A function to define the initial prizes of the vertices. By
         default zero. Note that you can change them any time with update_vertex_prizes.
         """
-        self._vertex_ids = VertexIds(ppi_instance.ppi_graph.nodes)
-        self._edge_ids = EdgeIds(ppi_instance.ppi_graph, self._vertex_ids)
-        if not initial_costs_fn:
-            initial_costs_fn = lambda e: ppi_instance.edge_weights[e]
-        edges = [(self._vertex_ids.get_id(e[0]), self._vertex_ids.get_id(e[1])) for e in
-                 ppi_instance.ppi_graph.edges]
-        self._edges = np.array(sorted(edges), dtype=np.int64)
-        self._prizes = np.array([initial_prize_fn(self._vertex_ids.get_label(i)) for i in
-                                 range(ppi_instance.ppi_graph.number_of_nodes())], dtype=np.float64)
-
-        def f(e):
-            e_v = self._vertex_ids.get_label(e[0])
-            e_w = self._vertex_ids.get_label(e[1])
-            return initial_costs_fn((e_v, e_w))
-
-        self._costs = np.array(np.apply_along_axis(f, axis=1, arr=self._edges),
-                               dtype=np.float64)
+        arrays = network_arrays(ppi_instance.ppi_graph)
+        self._vertex_ids = VertexIds(arrays.nodes)
+        self._edge_index = None
+        self._edges = arrays.edges
+        if initial_prize_fn is zero_prize:
+            self._prizes = np.zeros(arrays.number_of_nodes, dtype=np.float64)
+        else:
+            self._prizes = np.array([initial_prize_fn(v) for v in arrays.nodes], dtype=np.float64)
+
+        if not initial_costs_fn and hasattr(ppi_instance.edge_weights, 'costs'):
+            self._costs = np.asarray(ppi_instance.edge_weights.costs(arrays), dtype=np.float64)
+        else:
+            if not initial_costs_fn:
+                initial_costs_fn = lambda e: ppi_instance.edge_weights[e]
+            nodes = arrays.nodes
+            self._costs = np.fromiter((initial_costs_fn((nodes[u], nodes[v]))
+                                       for u, v in self._edges.tolist()),
+                                      dtype=np.float64, count=len(self._edges))
+
+    @classmethod
+    def for_instance(cls, ppi_instance: PPIInstance) -> "PcstInstance":
+        """
+        Returns a PcstInstance for the graph and the edge weights of the instance with
+        all prizes set to zero. It is created once per graph and edge weights (if the edge
+        weights have a cache_key, e.g., the gamma of bias-aware weights) and shared by
+        the following calls, so do not use two of them at the same time.
+        """
+        key = getattr(ppi_instance.edge_weights, 'cache_key', None)
+        if key is None:
+            return cls(ppi_instance)
+        key = (network_arrays(ppi_instance.ppi_graph).fingerprint, key)
+        pcst_graph = cls._cache.get(key)
+        if pcst_graph is None:
+            pcst_graph = cls(ppi_instance)
+            cls._cache[key] = pcst_graph
+            while len(cls._cache) > cls.max_cached_instances:
+                cls._cache.popitem(last=False)
+        else:
+            cls._cache.move_to_end(key)
+            pcst_graph.reset_prizes()
+        return pcst_graph
 
     @property
     def vertex_ids(self) -> VertexIds:
@@ -94,13 +125,26 @@ class PcstInstance:
         """
         return self._costs
 
+    def reset_prizes(self):
+        """
+        Sets the prizes of all vertices to zero, e.g., before the next set of terminals.
+        """
+        self._prizes.fill(0.0)
+
+    def _get_edge_id(self, e) -> int:
+        if self._edge_index is None:
+            self._edge_index = {(u, v): i for i, (u, v) in enumerate(self._edges.tolist())}
+        u = self._vertex_ids.get_id(e[0])
+        v = self._vertex_ids.get_id(e[1])
+        return self._edge_index[(min(u, v), max(u, v))]
+
     def update_edge_costs(self, d: typing.Dict):
         """
         Update the costs for some edges.
         The dict maps from edge to cost.
         """
         for edge in d:
-            self._costs[self._edge_ids.get_id(edge)] = d[edge]
+            self._costs[self._get_edge_id(edge)] = d[edge]
 
     def update_vertex_prizes(self, d: typing.Dict):
         for node in d:
@@ -118,4 +162,4 @@ class PcstInstance:
         Returns the costs of an edge identified by the networkx edge. To acces the edge
         regarding to its index, directly use self.costs[i]
         """
-        return self._costs[self._edge_ids.get_id(e)]
+        return self._costs[self._get_edge_id(e)]
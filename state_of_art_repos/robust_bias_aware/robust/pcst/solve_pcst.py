@@ -1,23 +1,40 @@
+import typing
 from timeit import default_timer as timer
 
 import pcst_fast
 import networkx as nx
+import numpy as np
 
 from .pcst_instance import PcstInstance
 
 
+def solve_pcst_ids(pcst_graph: PcstInstance) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """
+    Solves the PCST instance and returns the ids of the selected vertices and the
+    positions of the selected edges in pcst_graph.edges.
+    """
+    root = -1
+    num_clusters = 1
+    pruning = 'strong'
+    return pcst_fast.pcst_fast(pcst_graph.edges, pcst_graph.prizes,
+                               pcst_graph.costs, root, num_clusters, pruning,
+                               0)
+
+
 def solve_pcst(pcst_graph: PcstInstance) -> nx.Graph:
     """
     Solves the PCST instance. Should run in 0.3-1.0 seconds.
     It returns the selected subgraph without any labels, i.e. only vertices and edges, no
      weights or costs.
     """
-    root = -1
-    num_clusters = 1
-    pruning = 'strong'
-    vertices_, edges_ = pcst_fast.pcst_fast(pcst_graph.edges, pcst_graph.prizes,
-                                            pcst_graph.costs, root, num_clusters, pruning,
-                                            0)
+    vertices_, edges_ = solve_pcst_ids(pcst_graph)
+    return pcst_solution_graph(pcst_graph, vertices_, edges_)
+
+
+def pcst_solution_graph(pcst_graph: PcstInstance, vertices_, edges_) -> nx.Graph:
+    """
+    The networkx graph of a solution returned by solve_pcst_ids.
+    """
     G_ = nx.Graph()
     vertex_ids = pcst_graph.vertex_ids
     G_.add_nodes_from([vertex_ids.get_label(i) for i in vertices_])
@@ -1,5 +1,7 @@
 from .ppi_instance import PPIInstance
 from .edge_weights import UnitEdgeWeight, BiasAwareEdgeWeight
+from .network_arrays import NetworkArrays, network_arrays
+from .network_meta import NetworkMetaStore, compute_network_meta, network_meta_store
 from .read_ppi import read_ppi_network, add_study_bias_scores_to_network
 from .read_ppi_shuffled import read_ppi_shuffled
 from .read_terminals import read_terminals
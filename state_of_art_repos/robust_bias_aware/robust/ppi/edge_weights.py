@@ -1,4 +1,12 @@
+import hashlib
+import os
+from collections import OrderedDict
+
 import networkx as nx
+import numpy as np
+
+from .network_arrays import network_arrays
+from .read_ppi import read_study_bias_scores
 
 
 class UnitEdgeWeight:
@@ -6,30 +14,86 @@ class UnitEdgeWeight:
     Simple unit edge weights. Every edge has the same weight. A Steiner tree, thus,
     minimizes just the number of vertices.
     """
+    cache_key = ('unit',)
+
     def __getitem__(self, e):
         return 1.0
 
+    def costs(self, arrays):
+        """
+        The weights of all edges of the NetworkArrays, in the order of arrays.edges.
+        """
+        return np.ones(arrays.number_of_edges, dtype=np.float64)
+
             
 class BiasAwareEdgeWeight:
     """
-    TODO
+    Edge weights that penalize edges between well-studied vertices: the weight of an
+    edge is (1 - gamma) * average_max_bias + gamma * max(bias[u], bias[v]), where
+    average_max_bias is the average of max(bias[u], bias[v]) over all edges.
+    The study bias scores are kept in an array indexed like NetworkArrays, so all
+    weights are computed at once.
     """
-    def __init__(self, network: nx.Graph, gamma):
+
+    # (network fingerprint, study bias file, its mtime and size, gamma) -> BiasAwareEdgeWeight
+    _cache = OrderedDict()
+    max_cached_weights = 4
+
+    def __init__(self, network: nx.Graph, gamma, study_bias_scores=None):
+        """
+        study_bias_scores: The study bias scores of the vertices of network, in the order
+                    of network_arrays(network).nodes. If none, they are taken from the
+                    'study_bias_score' attribute of the vertices.
+        """
         self._graph = network
         self._gamma = float(gamma)
+        self._arrays = network_arrays(network)
+        if study_bias_scores is None:
+            biases = nx.get_node_attributes(network, 'study_bias_score')
+            study_bias_scores = [biases[v] for v in self._arrays.nodes]
+        self._biases = np.asarray(study_bias_scores, dtype=np.float64)
+        edges = self._arrays.edges
+        self._max_edge_biases = np.maximum(self._biases[edges[:, 0]], self._biases[edges[:, 1]])
         self._average_max_bias = self._calculate_average_max_bias()
-        
+        self.cache_key = ('bias_aware', self._gamma,
+                          hashlib.sha1(self._biases.tobytes()).hexdigest())
+
+    @classmethod
+    def from_file(cls, network: nx.Graph, path_to_study_bias_scores: str, gamma):
+        """
+        Returns the bias-aware edge weights of network for the study bias scores in the
+        file. They are computed once per network, file and gamma.
+        """
+        st = os.stat(path_to_study_bias_scores)
+        key = (network_arrays(network).fingerprint, os.path.abspath(path_to_study_bias_scores),
+               st.st_mtime_ns, st.st_size, float(gamma))
+        edge_weights = cls._cache.get(key)
+        if edge_weights is None:
+            edge_weights = cls(network, gamma,
+                               read_study_bias_scores(path_to_study_bias_scores, network))
+            cls._cache[key] = edge_weights
+            while len(cls._cache) > cls.max_cached_weights:
+                cls._cache.popitem(last=False)
+        else:
+            cls._cache.move_to_end(key)
+        return edge_weights
+
     def _calculate_average_max_bias(self):
-        biases = nx.get_node_attributes(self._graph, 'study_bias_score')
-        sum_ = 0
-        for u, v in self._graph.edges:
-            sum_ = sum_ + max(biases[u], biases[v])
-        return sum_ / self._graph.number_of_edges()
-    
+        return float(np.mean(self._max_edge_biases))
+
     def __getitem__(self, e):
-        max_edge_bias = max(self._graph.nodes[e[0]]['study_bias_score'], self._graph.nodes[e[1]]['study_bias_score'])
+        index = self._arrays.index
+        max_edge_bias = max(self._biases[index[e[0]]], self._biases[index[e[1]]])
         return (1 - self._gamma) * self._average_max_bias + self._gamma * max_edge_bias
 
+    def costs(self, arrays):
+        """
+        The weights of all edges of the NetworkArrays, in the order of arrays.edges.
+        """
+        if arrays.fingerprint != self._arrays.fingerprint:
+            raise ValueError('The edge weights were computed for another network.')
+        return (1 - self._gamma) * self._average_max_bias + self._gamma * self._max_edge_biases
+
 
 
 
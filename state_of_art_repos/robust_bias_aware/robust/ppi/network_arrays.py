@@ -0,0 +1,70 @@
+import hashlib
+import weakref
+
+import networkx as nx
+import numpy as np
+
+
+class NetworkArrays:
+    """
+    Numpy representation of a PPI-graph. The vertices are numbered in the order of
+    ppi_graph.nodes, which is also the numbering of the pcst_fast representation.
+    * nodes: The vertex labels, nodes[i] is the label of vertex i.
+    * edges: Array [[u,v], [u', v'], ...] with every edge once, u <= v, sorted
+        lexicographically.
+    * indptr, indices: The neighbors of vertex i are indices[indptr[i]:indptr[i+1]]
+        (CSR, every edge in both directions).
+    * fingerprint: A hash of the vertex labels and the edges. Two graphs with the same
+        fingerprint have the same numpy representation.
+    """
+
+    def __init__(self, ppi_graph: nx.Graph):
+        self.nodes = list(ppi_graph.nodes)
+        self.index = {v: i for i, v in enumerate(self.nodes)}
+        n = len(self.nodes)
+        m = ppi_graph.number_of_edges()
+        ends = np.fromiter((self.index[v] for e in ppi_graph.edges for v in e[:2]),
+                           dtype=np.int64, count=2 * m).reshape(-1, 2)
+        ends.sort(axis=1)
+        self.edges = ends[np.lexsort((ends[:, 1], ends[:, 0]))]
+
+        loops = self.edges[:, 0] == self.edges[:, 1]
+        rows = np.concatenate([self.edges[:, 0], self.edges[~loops, 1]])
+        cols = np.concatenate([self.edges[:, 1], self.edges[~loops, 0]])
+        order = np.lexsort((cols, rows))
+        self.indices = cols[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=self.indptr[1:])
+
+        h = hashlib.sha1()
+        h.update('\0'.join(map(str, self.nodes)).encode())
+        h.update(self.edges.tobytes())
+        self.fingerprint = h.hexdigest()
+
+    @property
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def number_of_edges(self) -> int:
+        return len(self.edges)
+
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+
+_network_arrays = weakref.WeakKeyDictionary()
+
+
+def network_arrays(ppi_graph: nx.Graph) -> NetworkArrays:
+    """
+    Returns the NetworkArrays of the graph. They are computed once per graph object
+    (the PPI-graph is not supposed to change) and recomputed if the number of
+    vertices or edges has changed.
+    """
+    arrays = _network_arrays.get(ppi_graph)
+    if arrays is None or arrays.number_of_nodes != ppi_graph.number_of_nodes() \
+            or arrays.number_of_edges != ppi_graph.number_of_edges():
+        arrays = NetworkArrays(ppi_graph)
+        _network_arrays[ppi_graph] = arrays
+    return arrays
@@ -0,0 +1,210 @@
+import json
+import os
+import tempfile
+
+import networkx as nx
+import numpy as np
+
+from .network_arrays import NetworkArrays, network_arrays
+
+META_VERSION = 3
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'robust')
+
+
+def _bfs(arrays: NetworkArrays, source: int, dist: np.ndarray):
+    """
+    Breadth-first search on the CSR arrays, one level at a time. dist holds -1 for
+    vertices that are not visited yet and gets the distances from source.
+    Returns the visited vertices and the vertices of the last level.
+    """
+    indptr, indices = arrays.indptr, arrays.indices
+    dist[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    levels = [frontier]
+    level = 0
+    while True:
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            break
+        # positions of all neighbors of the frontier in indices
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        neighbors = indices[offsets]
+        neighbors = np.unique(neighbors[dist[neighbors] < 0])
+        if len(neighbors) == 0:
+            break
+        level += 1
+        dist[neighbors] = level
+        frontier = neighbors
+        levels.append(frontier)
+    return np.concatenate(levels), frontier
+
+
+def _eccentricities(arrays: NetworkArrays, sources: np.ndarray) -> np.ndarray:
+    """
+    Eccentricities of the sources by bit-parallel BFS: 64 sources at a time, the
+    vertices reached from source k have bit k set in a uint64 per vertex.
+    """
+    indptr, indices = arrays.indptr, arrays.indices
+    # reduceat needs the starts of the non-empty rows only, empty rows reach nothing
+    nonempty = np.flatnonzero(np.diff(indptr) > 0)
+    starts = indptr[nonempty]
+    eccentricities = np.zeros(len(sources), dtype=np.int64)
+    for first in range(0, len(sources), 64):
+        batch = sources[first:first + 64]
+        bits = np.left_shift(np.uint64(1), np.arange(len(batch), dtype=np.uint64))
+        frontier = np.zeros(arrays.number_of_nodes, dtype=np.uint64)
+        np.bitwise_or.at(frontier, batch, bits)
+        visited = frontier.copy()
+        level = 0
+        while True:
+            reached = np.zeros_like(frontier)
+            reached[nonempty] = np.bitwise_or.reduceat(frontier[indices], starts)
+            frontier = reached & ~visited
+            new_bits = np.bitwise_or.reduce(frontier)
+            if new_bits == 0:
+                break
+            level += 1
+            visited |= frontier
+            eccentricities[first:first + len(batch)][(new_bits & bits) != 0] = level
+    return eccentricities
+
+
+def _middle_vertex(arrays: NetworkArrays, dist: np.ndarray, end: int) -> int:
+    """
+    Returns the vertex in the middle of a shortest path from the source of dist to end.
+    """
+    indptr, indices = arrays.indptr, arrays.indices
+    v = end
+    for _ in range(int(dist[end]) // 2):
+        neighbors = indices[indptr[v]:indptr[v + 1]]
+        v = int(neighbors[np.argmax(dist[neighbors] == dist[v] - 1)])
+    return v
+
+
+def _four_sweep(arrays: NetworkArrays, start: int):
+    """
+    4-sweep: two double sweeps, the second from the middle of the path found by the
+    first. Returns a lower bound of the diameter of the component of start and the
+    middle vertex of the second path, which is a good start for _ifub.
+    """
+    lower_bound = 0
+    source = start
+    for _ in range(2):
+        dist = np.full(arrays.number_of_nodes, -1, dtype=np.int64)
+        _, last_level = _bfs(arrays, source, dist)
+        a = int(last_level[0])
+        dist = np.full(arrays.number_of_nodes, -1, dtype=np.int64)
+        _, last_level = _bfs(arrays, a, dist)
+        b = int(last_level[0])
+        lower_bound = max(lower_bound, int(dist[b]))
+        source = _middle_vertex(arrays, dist, b)
+    return lower_bound, source
+
+
+def _ifub(arrays: NetworkArrays, start: int) -> int:
+    """
+    Exact diameter of the component of start by iFUB (Crescenzi et al., 2013): the
+    eccentricities of the vertices are computed level by level of the BFS from the
+    middle vertex of a 4-sweep, from the farthest level inwards, until the lower bound
+    reaches the upper bound 2*(level-1). On PPI-graphs this needs only a few BFS, in the
+    worst case one per vertex (64 at a time, see _eccentricities).
+    """
+    lower_bound, root = _four_sweep(arrays, start)
+    dist = np.full(arrays.number_of_nodes, -1, dtype=np.int64)
+    component, _ = _bfs(arrays, root, dist)
+    levels = dist[component]
+    lower_bound = max(lower_bound, int(levels.max()))
+    for level in range(int(levels.max()), 0, -1):
+        if lower_bound >= 2 * level:
+            break
+        fringe = component[levels == level]
+        lower_bound = max(lower_bound, int(_eccentricities(arrays, fringe).max()))
+    return lower_bound
+
+
+def compute_network_meta(ppi_graph: nx.Graph) -> dict:
+    """
+    Computes the meta data of a PPI-graph:
+    * graph_diameter: The diameter (largest diameter of a connected component), computed
+        by iFUB with BFS on the numpy arrays (see _ifub). It is at least 1, also for
+        graphs without edges, because the terminal prizes are scaled by it.
+    * degree_histogram: degree_histogram[d] is the number of vertices with degree d.
+    * component_sizes: The sizes of the connected components, in decreasing order.
+    """
+    arrays = network_arrays(ppi_graph)
+    degrees = arrays.degrees()
+    dist = np.full(arrays.number_of_nodes, -1, dtype=np.int64)
+    components = []
+    for v in np.flatnonzero(degrees > 0).tolist():
+        if dist[v] < 0:
+            components.append(_bfs(arrays, v, dist)[0])
+    component_sizes = sorted((len(c) for c in components), reverse=True)
+    component_sizes += [1] * int(np.sum(degrees == 0))
+
+    diameter = 0
+    for component in sorted(components, key=len, reverse=True):
+        if len(component) - 1 <= diameter:
+            break  # no larger diameter possible in the remaining components
+        start = int(component[np.argmax(degrees[component])])
+        diameter = max(diameter, _ifub(arrays, start))
+
+    return {
+        "graph_diameter": max(diameter, 1),
+        "degree_histogram": np.bincount(degrees).tolist(),
+        "component_sizes": component_sizes,
+    }
+
+
+class NetworkMetaStore:
+    """
+    The meta data of the PPI-graphs (see compute_network_meta), computed once per
+    network fingerprint and kept in memory and, if cache_dir is given, as small json
+    files in cache_dir.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._meta = {}
+
+    def _path(self, fingerprint):
+        return os.path.join(self.cache_dir, f'network_meta_{fingerprint}.json')
+
+    def _load(self, fingerprint):
+        try:
+            with open(self._path(fingerprint)) as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if meta.pop("version", None) != META_VERSION:
+            return None
+        return meta
+
+    def _save(self, fingerprint, meta):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp_', suffix='.json')
+            with os.fdopen(fd, 'w') as file:
+                json.dump(dict(meta, version=META_VERSION), file)
+            os.replace(tmp_path, self._path(fingerprint))
+        except OSError:
+            pass  # the meta data is only kept in memory
+
+    def get(self, ppi_graph: nx.Graph) -> dict:
+        """
+        Returns (a copy of) the meta data of the graph.
+        """
+        fingerprint = network_arrays(ppi_graph).fingerprint
+        meta = self._meta.get(fingerprint)
+        if meta is None and self.cache_dir is not None:
+            meta = self._load(fingerprint)
+        if meta is None:
+            meta = compute_network_meta(ppi_graph)
+            if self.cache_dir is not None:
+                self._save(fingerprint, meta)
+        self._meta[fingerprint] = meta
+        return dict(meta)
+
+
+network_meta_store = NetworkMetaStore()
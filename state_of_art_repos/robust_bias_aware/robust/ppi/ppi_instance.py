@@ -1,6 +1,7 @@
 import networkx as nx
 
 from .edge_weights import UnitEdgeWeight
+from .network_meta import network_meta_store
 
 
 class PPIInstance:
@@ -19,9 +20,9 @@ class PPIInstance:
         self.terminals = terminals
         self.edge_weights = edge_weights
         if not meta:
-            self.meta = {"graph_diameter": 8}  # Precomputed.
-            print("Setting the graph_diameter to the precomputed value of 8. "
-                  "Directly specify meta to overwrite this.")
+            # graph_diameter, degree_histogram and component_sizes, computed once per
+            # network (see NetworkMetaStore).
+            self.meta = network_meta_store.get(ppi_graph)
         else:
             self.meta = meta
 
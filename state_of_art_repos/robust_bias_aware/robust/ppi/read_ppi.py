@@ -1,19 +1,32 @@
 import networkx as nx
+import numpy as np
 import pandas as pd
+
+from .network_arrays import network_arrays
+
 # robust_dev_branch_clean/data/study_bias_scores/UNIPROT_STUDY_ATTENTION.csv
 
-def add_study_bias_scores_to_network(path_to_study_bias_scores: str, network: nx.Graph):
+def read_study_bias_scores(path_to_study_bias_scores: str, network: nx.Graph) -> np.ndarray:
     """
-    Reads the PPI-graph from file without any attributes such as weight.
+    Reads the study bias scores of the vertices of the PPI-graph as an array in the
+    order of network_arrays(network).nodes. Vertices without a score get 1.
     """
     study_bias_scores = pd.read_csv(path_to_study_bias_scores)
-    # print(study_bias_scores)
-    study_bias_dict = { study_bias_scores.loc[i, 'gene_or_protein']: study_bias_scores.loc[i, 'study_bias_score'] for i in range(study_bias_scores.shape[0]) }
-    # study_bias_dict=study_bias_scores.to_dict('list')
-    # study_bias_dict = dict(zip(study_bias_scores.gene_or_protein, study_bias_scores.study_bias_score))
-    nx.set_node_attributes(network, 1, 'study_bias_score')
-    for node in network:
-        network.nodes[node]['study_bias_score'] = study_bias_dict.get(node, 1)
+    # a later score of the same gene or protein overwrites the earlier ones
+    study_bias_scores = study_bias_scores.drop_duplicates('gene_or_protein', keep='last')
+    scores = pd.Series(study_bias_scores['study_bias_score'].to_numpy(dtype=np.float64),
+                       index=study_bias_scores['gene_or_protein'])
+    nodes = network_arrays(network).nodes
+    return scores.reindex(pd.Index(nodes, dtype=object)).fillna(1.0).to_numpy(dtype=np.float64)
+
+
+def add_study_bias_scores_to_network(path_to_study_bias_scores: str, network: nx.Graph):
+    """
+    Sets the study bias scores as 'study_bias_score' attribute of the vertices.
+    """
+    study_bias_scores = read_study_bias_scores(path_to_study_bias_scores, network)
+    nx.set_node_attributes(network, dict(zip(network_arrays(network).nodes,
+                                             study_bias_scores.tolist())), 'study_bias_score')
 
 
 def read_ppi_network(network: str, flag):
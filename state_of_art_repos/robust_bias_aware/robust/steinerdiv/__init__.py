@@ -1,3 +1,3 @@
-from .solution_set import SolutionSet
+from .solution_set import SolutionSet, SteinerTree
 from .display_solution_set import display_solution_set
 from .min_max_exponential_reduction import ExpMinMaxDiverseSteinerTreeComputer
\ No newline at end of file
@@ -1,8 +1,8 @@
 import numpy as np
 import networkx as nx
 
-from .solution_set import SolutionSet
-from ..pcst import PcstInstance, solve_pcst
+from .solution_set import SolutionSet, SteinerTree
+from ..pcst import PcstInstance, solve_pcst_ids
 from ..ppi import PPIInstance
 
 
@@ -40,30 +40,39 @@ class ExpMinMaxDiverseSteinerTreeComputer:
         self.reduction_factor = reduction_factor
         self.initial_terminal_multiple = initial_terminal_multiple
 
-    def iterate_solutions(self, ppi_instance: PPIInstance):
+    def iterate_solutions(self, ppi_instance: PPIInstance, pcst_graph: PcstInstance = None):
         """
-        Returns an infinite amount of steiner trees as a generator.
+        Returns an infinite amount of steiner trees (SteinerTree) as a generator.
+        pcst_graph: A PcstInstance of the graph and edge weights of the instance
+                    to reuse (e.g., from a previous instance with other terminals). All
+                    its prizes are overwritten. If none, PcstInstance.for_instance is
+                    used.
         """
         data = {
             "ppi_instance": ppi_instance,
-            "pcst_graph": PcstInstance(ppi_instance)
+            "pcst_graph": PcstInstance.for_instance(ppi_instance) if pcst_graph is None else pcst_graph
         }
         data["min_edge_cost"] = np.min(data["pcst_graph"].costs)
         data["max_edge_cost"] = np.max(data["pcst_graph"].costs)
+        vertex_ids = data["pcst_graph"].vertex_ids
+        data["terminal_ids"] = np.array([vertex_ids.get_id(v) for v in ppi_instance.terminals],
+                                        dtype=np.int64)
+        data["terminal_mask"] = np.zeros(len(data["pcst_graph"].prizes), dtype=bool)
+        data["terminal_mask"][data["terminal_ids"]] = True
         self._set_initial_prizes(data)
         while True:
             steiner_tree = self._compute_steiner_tree(data)
             yield steiner_tree
             self._reduce_prizes_of_used_steiner_vertices(data, steiner_tree)
 
-    def __call__(self, ppi_instance: PPIInstance, n=10):
+    def __call__(self, ppi_instance: PPIInstance, n=10, pcst_graph: PcstInstance = None):
         """
         Returns a solution set with n steiner trees for the instance.
         Will stop automatically after the first repetition, thus, it may be less than
         n steiner trees.
         """
         solution_set = SolutionSet(ppi_instance)
-        for s in self.iterate_solutions(ppi_instance):
+        for s in self.iterate_solutions(ppi_instance, pcst_graph):
             if len(solution_set) >= n:
                 break
             if s in solution_set:
@@ -71,16 +80,13 @@ class ExpMinMaxDiverseSteinerTreeComputer:
             solution_set.append(s)
         return solution_set
 
-    def _reduce_prizes_of_used_steiner_vertices(self, data, steiner_tree: nx.Graph):
+    def _reduce_prizes_of_used_steiner_vertices(self, data, steiner_tree: SteinerTree):
         """
         The prizes of the steiner points in the pcst-graph will be reduced.
         """
-        data["pcst_graph"].update_vertex_prizes(
-            {
-                v: self.reduction_factor * data["pcst_graph"].get_vertex_prize(v)
-                for v in steiner_tree.nodes if v not in data["ppi_instance"].terminals
-            }
-        )
+        vertices = steiner_tree.vertices
+        steiner_vertices = vertices[~data["terminal_mask"][vertices]]
+        data["pcst_graph"].prizes[steiner_vertices] *= self.reduction_factor
 
     def _set_initial_prizes(self, data):
         """
@@ -97,42 +103,29 @@ class ExpMinMaxDiverseSteinerTreeComputer:
         """
         d = data["ppi_instance"].meta["graph_diameter"]
         terminal_prize = self.initial_terminal_multiple * d * data["max_edge_cost"]
-        data["pcst_graph"].update_vertex_prizes(
-            {v: terminal_prize for v in data["ppi_instance"].terminals}
-        )
+        data["pcst_graph"].prizes[data["terminal_ids"]] = terminal_prize
 
     def _double_terminal_prizes(self, data):
         """
         Doubles the prizes of the terminals. Used if it was too low and not all terminals
         are integrated in the prize collecting steiner tree.
         """
-        data["pcst_graph"].update_vertex_prizes(
-            {
-                v: 2 * data["pcst_graph"].get_vertex_prize(v)
-                for v in data["ppi_instance"].terminals
-            }
-        )
+        data["pcst_graph"].prizes[data["terminal_ids"]] *= 2
 
     def _set_initial_steiner_prizes(self, data):
         """
         Sets the prizes of the steiner vertices (non-terminals).
         """
-        ppi_instance: PPIInstance = data["ppi_instance"]
         p = self.initial_fraction * data["min_edge_cost"]
-        data["pcst_graph"].update_vertex_prizes(
-            {
-                v: p
-                for v in ppi_instance.ppi_graph.nodes if
-                v not in ppi_instance.terminals
-            }
-        )
+        data["pcst_graph"].prizes[~data["terminal_mask"]] = p
 
     def _compute_steiner_tree(self, data):
         """
         Does the expensive computation of the steiner tree including doubling the prizes
         of the terminals if not all are integrated in the solution.
         """
-        st = solve_pcst(data["pcst_graph"])
+        vertices, edges = solve_pcst_ids(data["pcst_graph"])
+        st = SteinerTree(data["pcst_graph"], vertices, edges)
         # TODO: The following code was actually useless as it did not compute anything.
         #       The PCST algorithm cannot guarantee to contain all seeds. This would require
         #       an additional algorithm, possibly based on shortest path. Because the primary
@@ -1,49 +1,143 @@
+import typing
+
 import networkx as nx
+import numpy as np
 import pandas as pd
 
+from ..pcst import PcstInstance, pcst_solution_graph
 from ..ppi import PPIInstance
 
 
-class SolutionSet(list):
+class SteinerTree:
+    """
+    A steiner tree as returned by pcst_fast: the ids of its vertices and the positions of
+    its edges in the pcst-graph. The networkx graph is only built on request.
+    """
+
+    def __init__(self, pcst_graph: PcstInstance, vertices, edges):
+        self.pcst_graph = pcst_graph
+        self.vertices = np.asarray(vertices, dtype=np.int64)
+        self.edges = np.asarray(edges, dtype=np.int64)
+        assert len(self.edges) == len(self.vertices) - 1, "Result should be a tree"
+        # Two trees with the same vertices have the same signature.
+        self.signature = np.sort(self.vertices).tobytes()
+        self._graph = None
+
+    @property
+    def graph(self) -> nx.Graph:
+        if self._graph is None:
+            self._graph = pcst_solution_graph(self.pcst_graph, self.vertices, self.edges)
+        return self._graph
+
+    def cost(self) -> float:
+        return float(self.pcst_graph.costs[self.edges].sum())
+
+    def __len__(self):
+        return len(self.vertices)
+
+
+class SolutionSet(typing.Sequence):
     """
     A simple class that allows some aggregation functions on the solution set.
+    The solutions are kept as SteinerTrees (see trees). Indexing and iterating give the
+    networkx graphs of the trees.
     """
 
     def __init__(self, ppi_instance: PPIInstance):
         super().__init__()
         self.ppi_instance = ppi_instance
+        self.trees: typing.List[SteinerTree] = []
+        self._signatures = set()
+        self._occurrences = None
+
+    def append(self, tree: SteinerTree):
+        self.trees.append(tree)
+        self._signatures.add(tree.signature)
+        self._occurrences = None
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [tree.graph for tree in self.trees[i]]
+        return self.trees[i].graph
+
+    def __len__(self):
+        return len(self.trees)
+
+    def __contains__(self, item: SteinerTree):
+        return item.signature in self._signatures
+
+    def _occurrence_matrix(self):
+        """
+        Returns the ids of all vertices in the order of their first occurrence and a
+        boolean matrix vertex x tree with the occurrences.
+        """
+        if self._occurrences is None:
+            sizes = [len(tree) for tree in self.trees]
+            all_vertices = np.concatenate([tree.vertices for tree in self.trees]) if self.trees \
+                else np.zeros(0, dtype=np.int64)
+            unique, first, rows = np.unique(all_vertices, return_index=True, return_inverse=True)
+            order = np.argsort(first, kind="stable")
+            position = np.empty_like(order)
+            position[order] = np.arange(len(order))
+            matrix = np.zeros((len(unique), len(self.trees)), dtype=bool)
+            matrix[position[rows.reshape(-1)], np.repeat(np.arange(len(self.trees)), sizes)] = True
+            self._occurrences = unique[order], matrix
+        return self._occurrences
+
+    def first(self, n) -> "SolutionSet":
+        """
+        Returns the solution set of the first n trees. It shares the trees and the
+        occurrence matrix with this one, e.g., to get the modules of several n from the
+        trees computed for the largest n.
+        """
+        subset = SolutionSet(self.ppi_instance)
+        for tree in self.trees[:n]:
+            subset.append(tree)
+        if subset.trees:
+            ids, matrix = self._occurrence_matrix()
+            matrix = matrix[:, :n]
+            occurs = matrix.any(axis=1)
+            subset._occurrences = ids[occurs], matrix[occurs]
+        return subset
+
+    def _labels(self, ids) -> list:
+        vertex_ids = self.trees[0].pcst_graph.vertex_ids
+        return [vertex_ids.get_label(i) for i in ids.tolist()]
+
+    def _is_terminal(self, ids) -> np.ndarray:
+        terminals = set(self.ppi_instance.terminals)
+        return np.array([v in terminals for v in self._labels(ids)], dtype=bool)
 
     def min_cost(self) -> float:
-        return min(self.ppi_instance.compute_cost(s) for s in self)
+        return min(tree.cost() for tree in self.trees)
 
     def max_cost(self) -> float:
-        return max(self.ppi_instance.compute_cost(s) for s in self)
+        return max(tree.cost() for tree in self.trees)
 
     def avg_cost(self) -> float:
-        costs = [self.ppi_instance.compute_cost(s) for s in self]
+        costs = [tree.cost() for tree in self.trees]
         return sum(costs) / len(costs)
 
     def vertices(self, first_n=None):
-        all_vertices = set()
-        if first_n is None:
-            first_n = len(self)
-        for s in self[0:first_n]:
-            for v in s.nodes:
-                all_vertices.add(v)
-        return all_vertices
+        if not self.trees:
+            return set()
+        ids, matrix = self._occurrence_matrix()
+        return set(self._labels(ids[matrix[:, :first_n].any(axis=1)]))
 
     def number_of_vertices(self) -> int:
-        return len(self.vertices())
+        return len(self._occurrence_matrix()[0])
 
     def number_of_occurrences(self, v):
-        return sum(v in s.nodes for s in self)
+        ids, matrix = self._occurrence_matrix()
+        row = np.flatnonzero(ids == self.trees[0].pcst_graph.vertex_ids.get_id(v))
+        return int(matrix[row].sum())
 
     def tree_list(self, v):
-        tree_list = []
-        for i in range(len(self)):
-            if v in self[i].nodes:
-                tree_list.append(str(i))
-        return ",".join(tree_list)
+        ids, matrix = self._occurrence_matrix()
+        row = np.flatnonzero(ids == self.trees[0].pcst_graph.vertex_ids.get_id(v))
+        if len(row) == 0:
+            return ""
+        return ",".join(map(str, np.flatnonzero(matrix[row[0]]).tolist()))
 
     def get_occurrences(self, include_terminals=False, first_n=None) -> pd.DataFrame:
         """
@@ -52,14 +146,21 @@ class SolutionSet(list):
         * #occurrences: The number of occurrences
         * %occurrences: The relative occurences (0.0-1.0)
         * terminal: If it is a terminal (use include_terminals=True to include them).
+        Vertices with the same number of occurrences are in the order of their first
+        occurrence.
         """
         data = {"vertex": [], "#occurrences": [], "%occurrences": [], "terminal": []}
-        for v in self.vertices(first_n=first_n):
-            if include_terminals or v not in self.ppi_instance.terminals:
-                data["vertex"].append(v)
-                data["#occurrences"].append(self.number_of_occurrences(v))
-                data["%occurrences"].append(self.number_of_occurrences(v) / len(self))
-                data["terminal"].append(v in self.ppi_instance.terminals)
+        if self.trees:
+            ids, matrix = self._occurrence_matrix()
+            selected = matrix[:, :first_n].any(axis=1)
+            is_terminal = self._is_terminal(ids)
+            if not include_terminals:
+                selected &= ~is_terminal
+            counts = matrix[selected].sum(axis=1)
+            data["vertex"] = self._labels(ids[selected])
+            data["#occurrences"] = counts.tolist()
+            data["%occurrences"] = (counts / len(self)).tolist()
+            data["terminal"] = is_terminal[selected].tolist()
         return pd.DataFrame(data).sort_values(["#occurrences"], ascending=False,
                                               kind="mergesort").set_index("vertex")
 
@@ -67,27 +168,27 @@ class SolutionSet(list):
         """
         Returns the induced subgraph
         """
-        import networkx as nx
         G = nx.Graph()
-        for graph in self:
-            for n in graph.nodes:
-                if n not in G.nodes:
-                    is_seed = False
-                    if n in self.ppi_instance.terminals:
-                        is_seed = True
-                    G.add_node(n,
-                               isSeed=is_seed,
-                               significance=self.number_of_occurrences(n) / len(self),
-                               nrOfOccurrences=self.number_of_occurrences(n),
-                               trees=self.tree_list(n))
-            G.add_edges_from(graph.edges)
+        if not self.trees:
+            return G
+        ids, matrix = self._occurrence_matrix()
+        counts = matrix.sum(axis=1)
+        labels = self._labels(ids)
+        is_terminal = self._is_terminal(ids)
+        for i, n in enumerate(labels):
+            G.add_node(n,
+                       isSeed=bool(is_terminal[i]),
+                       significance=float(counts[i] / len(self)),
+                       nrOfOccurrences=int(counts[i]),
+                       trees=",".join(map(str, np.flatnonzero(matrix[i]).tolist())))
+        pcst_graph = self.trees[0].pcst_graph
+        edges = pcst_graph.edges[np.unique(np.concatenate([tree.edges for tree in self.trees]))]
+        vertex_ids = pcst_graph.vertex_ids
+        G.add_edges_from((vertex_ids.get_label(u), vertex_ids.get_label(v))
+                         for u, v in edges.tolist())
         selected_nodes = [n for n,v in G.nodes(data=True) if v['significance'] >= threshold]
         return G.subgraph(selected_nodes)
 
 
     def avg_size(self) -> float:
-        return sum(s.number_of_nodes() for s in self) / len(self)
-
-    def __contains__(self, item):
-        vertices = set(item.nodes)
-        return any(vertices == set(g.nodes) for g in self)
+        return sum(len(tree) for tree in self.trees) / len(self)